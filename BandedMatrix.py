@@ -0,0 +1,300 @@
+# BandedMatrix.py
+
+# region imports
+import numpy as np
+# endregion
+
+
+def Bandwidth(A):
+    """
+    :param A: a dense square matrix (list of rows or array)
+    :return: (lower, upper) bandwidth: A[i][j] == 0 whenever i - j > lower or j - i > upper
+    """
+    rows, cols = np.nonzero(np.asarray(A))
+    if rows.size == 0:
+        return 0, 0
+    offset = cols - rows
+    return int(max(0, -offset.min())), int(max(0, offset.max()))
+
+
+class BandedMatrix:
+    """
+    Compact storage for an n x n matrix with lower bandwidth l and upper bandwidth u.
+    Row i is kept in band[i, :] with A[i][j] at band[i, j - i + l], so memory is n*(l+u+1) instead of n*n;
+    slots outside the matrix are zero.
+    """
+    __slots__ = ("band", "lower", "upper")
+
+    def __init__(self, band, lower, upper):
+        """
+        :param band: n x (lower+upper+1) array in the layout above
+        """
+        self.band = np.asarray(band, dtype=float)
+        self.lower = lower
+        self.upper = upper
+
+    @classmethod
+    def FromDense(cls, A, lower=None, upper=None):
+        """
+        Pack a dense matrix; the bandwidths are measured with Bandwidth if not given.
+        """
+        A = np.asarray(A, dtype=float)
+        if lower is None or upper is None:
+            lower, upper = Bandwidth(A)
+        n = len(A)
+        band = np.zeros((n, lower + upper + 1))
+        for d in range(-lower, upper + 1):
+            diag = A.diagonal(d)
+            if d >= 0:
+                band[:n - d, lower + d] = diag
+            else:
+                band[-d:, lower + d] = diag
+        return cls(band, lower, upper)
+
+    @classmethod
+    def Tridiagonal(cls, sub, diag, sup):
+        """
+        Build from the three diagonals (sub[i] = A[i+1][i], sup[i] = A[i][i+1]).
+        """
+        n = len(diag)
+        band = np.zeros((n, 3))
+        band[1:, 0] = sub
+        band[:, 1] = diag
+        band[:-1, 2] = sup
+        return cls(band, 1, 1)
+
+    def __len__(self):
+        return len(self.band)
+
+    def ToDense(self):
+        n = len(self.band)
+        A = np.zeros((n, n))
+        for d in range(-self.lower, self.upper + 1):
+            i = np.arange(max(0, -d), min(n, n - d))
+            A[i, i + d] = self.band[i, self.lower + d]
+        return A
+
+    def MatVec(self, x):
+        """
+        :return: A x in O(n*(l+u+1))
+        """
+        x = np.asarray(x, dtype=float)
+        n = len(self.band)
+        y = np.zeros(n)
+        for d in range(-self.lower, self.upper + 1):
+            i = np.arange(max(0, -d), min(n, n - d))
+            y[i] += self.band[i, self.lower + d] * x[i + d]
+        return y
+
+    def IsSymmetric(self, tol=1e-12):
+        if self.lower != self.upper:
+            return False
+        l = self.lower
+        n = len(self.band)
+        for d in range(1, l + 1):
+            if np.abs(self.band[:n - d, l + d] - self.band[d:, l - d]).max(initial=0.0) > tol:
+                return False
+        return True
+
+    def IsDiagonallyDominant(self):
+        """
+        :return: True if every row is strictly diagonally dominant, |A[i][i]| > sum_{j != i} |A[i][j]|, which
+                 makes elimination without row exchanges stable (Thomas, BandedLUSolve)
+        """
+        absBand = np.abs(self.band)
+        diag = absBand[:, self.lower]
+        return bool(np.all(diag > absBand.sum(axis=1) - diag))
+
+
+# a pivot smaller than this fraction of its row's size means elimination without row exchanges would amplify
+# rounding errors by more than 1/_SMALL_PIVOT, so ThomasSolve and BandedLUSolve refuse it
+_SMALL_PIVOT = 1e-8
+
+
+class SmallPivotError(ValueError):
+    """
+    Raised by ThomasSolve and BandedLUSolve when elimination without row exchanges meets a small pivot.
+    """
+
+
+def ThomasSolve(sub, diag, sup, d):
+    """
+    Thomas algorithm for a tridiagonal system in O(n) (no pivoting, so the matrix should be diagonally dominant
+    or SPD).  Raises SmallPivotError on a pivot that is small relative to its row.
+    :param sub: sub-diagonal, sub[i] = A[i+1][i] (length n-1)
+    :param diag: main diagonal (length n)
+    :param sup: super-diagonal, sup[i] = A[i][i+1] (length n-1)
+    :param d: right-hand side vector or n x k matrix
+    :return: x as an array with the shape of d
+    """
+    n = len(diag)
+    c = np.empty(n)
+    x = np.array(d, dtype=float)  # rows of x are overwritten in order, so d[i] is read before x[i] changes
+    rowSize = np.abs(diag) + np.concatenate(([0.0], np.abs(sub))) + np.concatenate((np.abs(sup), [0.0]))
+    denom = diag[0]
+    if abs(denom) <= _SMALL_PIVOT * rowSize[0]:
+        raise SmallPivotError("Small pivot in the Thomas algorithm at row 0.")
+    c[0] = sup[0] / denom if n > 1 else 0.0
+    x[0] /= denom
+    for i in range(1, n):
+        denom = diag[i] - sub[i - 1] * c[i - 1]
+        if abs(denom) <= _SMALL_PIVOT * rowSize[i]:
+            raise SmallPivotError("Small pivot in the Thomas algorithm at row {}.".format(i))
+        c[i] = sup[i] / denom if i < n - 1 else 0.0
+        x[i] = (x[i] - sub[i - 1] * x[i - 1]) / denom
+    for i in range(n - 2, -1, -1):
+        x[i] -= c[i] * x[i + 1]
+    return x
+
+
+def BandedLUSolve(B, b):
+    """
+    Solve Ax = b by LU factorization in banded storage without pivoting, O(n*l*u).
+    Without row exchanges L keeps bandwidth l and U keeps bandwidth u; this is safe for diagonally dominant and
+    SPD matrices, and a pivot that is small relative to its row raises SmallPivotError so the caller can use
+    BandedPivotLUSolve instead.
+    :param B: a BandedMatrix
+    :param b: right-hand side vector or n x k matrix
+    :return: x as an array
+    """
+    W = B.band.copy()
+    l, u = B.lower, B.upper
+    n = len(W)
+    rowSize = np.abs(W).sum(axis=1)
+    t = np.arange(l)
+    cols = np.arange(u)
+    for k in range(n):
+        piv = W[k, l]
+        if abs(piv) <= _SMALL_PIVOT * rowSize[k]:
+            raise SmallPivotError("Small pivot in banded LU at row {}.".format(k))
+        r = min(l, n - 1 - k)
+        if r == 0:
+            continue
+        rows = k + 1 + t[:r]
+        off = l - 1 - t[:r]  # where column k sits in rows k+1..k+r
+        m = W[rows, off] / piv
+        W[rows, off] = m  # keep the multipliers in place of the eliminated entries
+        if u:
+            W[rows[:, None], off[:, None] + 1 + cols] -= m[:, None] * W[k, l + 1:l + 1 + u]
+
+    y = np.array(b, dtype=float)
+    for i in range(1, n):
+        j0 = max(0, i - l)
+        y[i] -= W[i, l - (i - j0):l] @ y[j0:i]
+    for i in range(n - 1, -1, -1):
+        j1 = min(n, i + u + 1)
+        y[i] = (y[i] - W[i, l + 1:l + (j1 - i)] @ y[i + 1:j1]) / W[i, l]
+    return y
+
+
+def BandedPivotLUSolve(B, b):
+    """
+    Solve Ax = b by banded LU factorization with partial pivoting (LAPACK gbsv), O(n*l*(l+u)).
+    Row exchanges only happen within the l rows below the pivot, so U keeps bandwidth l+u: row i of the
+    working array holds columns i-l..i+l+u at W[i, j - i + l].  The multipliers of step k are kept in M[k] and
+    applied to b together with the row exchange, as in the factorization.
+    Raises ValueError if A is singular to working precision.
+    :param B: a BandedMatrix
+    :param b: right-hand side vector or n x k matrix
+    :return: x as an array
+    """
+    l, u = B.lower, B.upper
+    n = len(B.band)
+    width = 2 * l + u + 1
+    W = np.zeros((n, width))
+    W[:, :l + u + 1] = B.band
+    M = np.zeros((n, l))
+    swap = np.arange(n)
+    tiny = n * np.finfo(float).eps * np.abs(B.band).max(initial=0.0)
+    t = np.arange(1, l + 1)
+    for k in range(n):
+        r = min(l, n - 1 - k)
+        # column k sits at offset l - s in row k + s
+        s = int(np.argmax(np.abs(W[k + np.arange(r + 1), l - np.arange(r + 1)])))
+        if s:
+            rowK, rowP = W[k].copy(), W[k + s].copy()
+            W[k], W[k + s] = 0.0, 0.0
+            W[k, s:] = rowP[:width - s]  # shift row k+s into row k's frame (its columns < k are already zero)
+            W[k + s, :width - s] = rowK[s:]
+            swap[k] = k + s
+        piv = W[k, l]
+        if abs(piv) <= tiny:
+            raise ValueError("Matrix is singular.")
+        if r == 0:
+            continue
+        rows = k + t[:r]
+        off = l - t[:r]
+        m = W[rows, off] / piv
+        M[k, :r] = m
+        W[rows, off] = 0.0
+        W[rows[:, None], off[:, None] + 1 + np.arange(l + u)] -= m[:, None] * W[k, l + 1:]
+
+    y = np.array(b, dtype=float)
+    for k in range(n):
+        p = swap[k]
+        if p != k:
+            y[[k, p]] = y[[p, k]]
+        r = min(l, n - 1 - k)
+        if r:
+            y[k + 1:k + 1 + r] -= np.multiply.outer(M[k, :r], y[k])
+    for i in range(n - 1, -1, -1):
+        j1 = min(n, i + l + u + 1)
+        y[i] = (y[i] - W[i, l + 1:l + (j1 - i)] @ y[i + 1:j1]) / W[i, l]
+    return y
+
+
+def BandedCholeskySolve(B, b):
+    """
+    Solve Ax = b for a symmetric positive definite banded A with A = L L^T, where L keeps the bandwidth l and is
+    stored as an n x (l+1) array (L[i][j] at Lb[i, j - i + l]).  O(n*l^2) time and O(n*l) memory.
+    Raises ValueError if A is not positive definite.
+    :param B: a symmetric BandedMatrix
+    :param b: right-hand side vector or n x k matrix
+    :return: x as an array
+    """
+    l = B.lower
+    n = len(B.band)
+    Lb = np.zeros((n, l + 1))
+    for j in range(n):
+        d = B.band[j, l] - Lb[j, :l] @ Lb[j, :l]
+        if d <= 0.0:
+            raise ValueError("Matrix is not positive definite (pivot {}).".format(j))
+        Lb[j, l] = np.sqrt(d)
+        for t in range(1, min(l, n - 1 - j) + 1):
+            i = j + t
+            Lb[i, l - t] = (B.band[i, l - t] - Lb[i, :l - t] @ Lb[j, t:l]) / Lb[j, l]
+
+    y = np.array(b, dtype=float)
+    for i in range(n):
+        j0 = max(0, i - l)
+        y[i] = (y[i] - Lb[i, l - (i - j0):l] @ y[j0:i]) / Lb[i, l]
+    t = np.arange(1, l + 1)
+    for i in range(n - 1, -1, -1):
+        r = min(l, n - 1 - i)
+        # row i of L^T is column i of L: L[i+t][i] = Lb[i+t, l-t]
+        y[i] = (y[i] - Lb[i + t[:r], l - t[:r]] @ y[i + 1:i + 1 + r]) / Lb[i, l]
+    return y
+
+
+def BandedSolve(B, b):
+    """
+    Pick the cheapest stable banded solver: elimination without row exchanges (Thomas for tridiagonal, banded LU
+    otherwise) only when A is strictly diagonally dominant, Cholesky when A is symmetric positive definite, and
+    banded LU with partial pivoting for everything else.
+    Raises ValueError if A is singular.
+    :return: (x, method_str)
+    """
+    if B.IsDiagonallyDominant():
+        try:
+            if B.lower == B.upper == 1:
+                band = B.band
+                return ThomasSolve(band[1:, 0], band[:, 1], band[:-1, 2], b), "Thomas"
+            return BandedLUSolve(B, b), "Banded LU"
+        except SmallPivotError:
+            pass
+    if B.IsSymmetric():
+        try:
+            return BandedCholeskySolve(B, b), "Banded Cholesky"
+        except ValueError:
+            pass
+    return BandedPivotLUSolve(B, b), "Banded LU (pivoted)"
@@ -0,0 +1,101 @@
+# DoolittleMethod.py
+
+# region imports
+import numpy as np
+# endregion
+
+
+class LUFactorization:
+    """
+    Doolittle LU factorization with partial pivoting, PA = LU, where L has a unit diagonal.
+    Factor once (O(n^3)) and then call Solve for as many right-hand sides as needed (O(n^2) each).
+    L and U are stored together in one n x n array: U on and above the diagonal, L below it.
+    """
+    __slots__ = ("LU", "perm", "sign")
+
+    def __init__(self, A, dtype=float):
+        LU = np.array(A, dtype=dtype)
+        n = LU.shape[0]
+        if LU.shape != (n, n):
+            raise ValueError("LU factorization needs a square matrix.")
+        perm = np.arange(n)
+        sign = 1.0
+        for k in range(n):
+            # Doolittle: the candidates for U[k][k] are column k of what is left of A after the first k steps
+            cand = LU[k:, k] - LU[k:, :k] @ LU[:k, k]
+            p = k + int(np.argmax(np.abs(cand)))
+            if cand[p - k] == 0.0:
+                raise ValueError("Matrix is singular.")
+            if p != k:
+                LU[[k, p]] = LU[[p, k]]
+                perm[[k, p]] = perm[[p, k]]
+                cand[[0, p - k]] = cand[[p - k, 0]]
+                sign = -sign
+            # row k of U, then column k of L
+            LU[k, k] = cand[0]
+            LU[k, k + 1:] -= LU[k, :k] @ LU[:k, k + 1:]
+            LU[k + 1:, k] = cand[1:] / cand[0]
+        self.LU = LU
+        self.perm = perm
+        self.sign = sign
+
+    def L(self):
+        """
+        :return: the unit lower triangular factor as an array
+        """
+        return np.tril(self.LU, -1) + np.eye(len(self.LU), dtype=self.LU.dtype)
+
+    def U(self):
+        """
+        :return: the upper triangular factor as an array
+        """
+        return np.triu(self.LU)
+
+    def Solve(self, b):
+        """
+        Solve Ax = b by forward substitution (Ly = Pb) and back substitution (Ux = y).
+        :param b: a vector of length n, or an n x k matrix whose k columns are solved together
+        :return: x with the same shape as b; a list if b was a list
+        """
+        LU = self.LU
+        n = len(LU)
+        y = np.array(b, dtype=LU.dtype)[self.perm]
+        for i in range(1, n):
+            y[i] -= LU[i, :i] @ y[:i]
+        for i in range(n - 1, -1, -1):
+            y[i] = (y[i] - LU[i, i + 1:] @ y[i + 1:]) / LU[i, i]
+        return y.tolist() if isinstance(b, list) else y
+
+    def Determinant(self):
+        """
+        :return: det(A) = sign(P) * product of the diagonal of U
+        """
+        return self.sign * float(np.prod(self.LU.diagonal()))
+
+
+def LUSolve(A, b):
+    """
+    Factor A and solve Ax = b in one call.  To solve many right-hand sides against the same A, build an
+    LUFactorization once and call its Solve method instead.
+    :param A: the coefficient matrix
+    :param b: right-hand side vector (or n x k matrix of right-hand sides)
+    :return: the solution x
+    """
+    return LUFactorization(A).Solve(b)
+
+
+def main():
+    A = [[1.0, 1.0, -3.0, 2.0],
+         [-1.0, 5.0, 5.0, 0.0],
+         [3.0, -5.0, 19.0, 3.0],
+         [0.0, 0.0, 2.0, 2.0]]
+    b = [15.0, -35.0, 94.0, 21.0]
+    LU = LUFactorization(A)
+    print("x =", LU.Solve(b))
+    print("det(A) =", LU.Determinant())
+    # the same factorization answers several right-hand sides at once
+    print("X =", LU.Solve(np.column_stack((b, np.ones(4)))))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,9 +9,136 @@
 # region imports
 import copy as CP
 from copy import deepcopy as dc  # a quick way to access deepcopy through an alias
+import numpy as np
 # endregion
 
 # region functions
+# Every matrix function below accepts either a list of row lists or a NumPy array.  Lists keep the original
+# list-based behaviour; arrays are handled with vectorized NumPy operations, and each result comes back in
+# the same type as the (first) matrix argument.
+def _IsArray(A):
+    '''
+    True if A should be handled with NumPy (a NumPy array or a Matrix) rather than as a list of rows.
+    '''
+    return isinstance(A, (np.ndarray, Matrix))
+
+def _Like(M, A):
+    '''
+    Return the NumPy array M in the same type as A (array, Matrix, or list of row lists).
+    '''
+    if isinstance(A, Matrix):
+        return Matrix.Wrap(M)
+    return M if _IsArray(A) else M.tolist()
+
+class Matrix:
+    '''
+    A compact dense matrix stored row-major in one contiguous float64 buffer.
+    The buffer can reserve spare columns, so augmenting with b or the identity writes into the reserved space
+    and returns a view [A|B] that shares memory with A instead of deep-copying A.  Row, Col and Cols return
+    views as well, so none of them allocate O(n^2) memory.  A Matrix indexes like a list of rows (len(A),
+    A[i][j]) and converts to a NumPy array without copying, so it can be passed to every function in this module.
+    '''
+    __slots__ = ("_buf", "_cols")
+
+    def __init__(self, A, spare=0):
+        '''
+        :param A: a list of rows or a 2-D array to copy into the new buffer
+        :param spare: number of extra columns to reserve for later augmentation
+        '''
+        A = np.asarray(A, dtype=float)
+        rows, cols = A.shape
+        self._buf = np.empty(rows * (cols + spare)).reshape(rows, cols + spare)
+        self._buf[:, :cols] = A
+        self._cols = cols
+
+    @classmethod
+    def Wrap(cls, arr, cols=None):
+        '''
+        Make a Matrix that uses the 2-D array arr as its buffer without copying it.
+        :param cols: number of columns in use (the rest is spare capacity); all of them by default
+        '''
+        M = cls.__new__(cls)
+        M._buf = arr
+        M._cols = arr.shape[1] if cols is None else cols
+        return M
+
+    @property
+    def shape(self):
+        return (self._buf.shape[0], self._cols)
+
+    @property
+    def spare(self):
+        '''
+        Number of reserved but unused columns.
+        '''
+        return self._buf.shape[1] - self._cols
+
+    def Array(self):
+        '''
+        The matrix as a NumPy array view (no copy).
+        '''
+        return self._buf[:, :self._cols]
+
+    def __array__(self, dtype=None, copy=None):
+        A = self.Array()
+        if copy:
+            A = A.copy()
+        return A if dtype is None else A.astype(dtype, copy=False)
+
+    def __len__(self):
+        return self._buf.shape[0]
+
+    def __getitem__(self, index):
+        return self.Array()[index]
+
+    def __setitem__(self, index, value):
+        self.Array()[index] = value
+
+    def __repr__(self):
+        return "Matrix({})".format(self.Array().tolist())
+
+    def tolist(self):
+        return self.Array().tolist()
+
+    def Row(self, i):
+        '''
+        View of row i (writes go into the matrix).
+        '''
+        return self._buf[i, :self._cols]
+
+    def Col(self, j):
+        '''
+        View of column j (writes go into the matrix).
+        '''
+        return self.Array()[:, j]
+
+    def Cols(self, j0, j1):
+        '''
+        Matrix view of columns j0 up to (not including) j1, sharing the buffer.
+        '''
+        return Matrix.Wrap(self.Array()[:, j0:j1])
+
+    def Augment(self, B):
+        '''
+        Return [A|B].  If A has enough spare columns, B is written into them and the result is a view sharing
+        A's buffer (A itself still shows only its own columns, and the view's B columns are overwritten if A is
+        augmented again); otherwise a new buffer is allocated.
+        :param B: a column vector or a matrix with the same number of rows as A
+        '''
+        B = np.asarray(B, dtype=float)
+        B = B.reshape(len(B), -1)
+        k = B.shape[1]
+        if k <= self.spare:
+            self._buf[:, self._cols:self._cols + k] = B
+            return Matrix.Wrap(self._buf, self._cols + k)
+        return Matrix(np.hstack((self.Array(), B)))
+
+    def AugmentIdentity(self):
+        '''
+        Return [A|I], see Augment.
+        '''
+        return self.Augment(np.eye(len(self)))
+
 def FirstNonZero_Index(R):
     """
     Finds pivot for a row (i.e., first non-zero number in a row reading from left to right)
@@ -26,10 +153,81 @@ def FirstNonZero_Index(R):
 def MakeDiagDom(A):
     """
     This function reorders the rows of matrix A to put the largest absolute values along the diagonal.
+    The rows are reordered in place (A may be a list of rows or a NumPy array, square or augmented [A|b]);
+    see DiagDomPermutation for how the order is chosen and to find out if strict dominance was reached.
     :param A: The matrix to sort
     :return: The sorted matrix
     """
-    pass
+    perm, strict = DiagDomPermutation(A)
+    A[:] = [A[r] for r in perm] if isinstance(A, list) else A[perm]
+    return A
+
+def DiagDomPermutation(A):
+    """
+    Finds the row order that makes A as diagonally dominant as possible.
+    Row r placed at position j has relative weight w = |A[r][j]| / sum_k |A[r][k]| (strict dominance needs
+    w > 1/2 in every row).  The order maximizing the product of the diagonal weights is an assignment
+    problem, solved with the Hungarian algorithm on costs -log(w) in O(n^3) time with vectorized inner loops
+    instead of trying all n! orderings.  Only the first n columns count, so an augmented [A|b] works too.
+    :param A: a matrix with n rows and at least n columns
+    :return: (perm, strict) where row perm[j] of A belongs at position j and strict tells if the reordered
+             matrix is strictly diagonally dominant
+    """
+    M = np.abs(np.array(A, dtype=float))
+    n = M.shape[0]
+    M = M[:, :n]
+    rowSums = M.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cost = -np.log(M / rowSums)
+    finite = np.isfinite(cost)
+    # a zero can only go on the diagonal if nothing else fits; give it a cost larger than any full assignment
+    big = (np.abs(cost[finite]).max() + 1.0) * (n + 1) if finite.any() else 1.0
+    cost[~finite] = big
+
+    perm = _Assignment(cost)
+    diag = M[perm, np.arange(n)]
+    strict = bool(np.all(2.0 * diag > rowSums[perm, 0]))
+    return perm, strict
+
+def _Assignment(cost):
+    """
+    Hungarian algorithm (shortest augmenting paths with row/column potentials) for a square cost matrix.
+    :return: perm such that row perm[j] is assigned to column j and the total cost is minimal
+    """
+    n = cost.shape[0]
+    u = np.zeros(n + 1)  # row potentials (1-based, index 0 unused)
+    v = np.zeros(n + 1)  # column potentials, column 0 is the virtual start column
+    p = np.zeros(n + 1, dtype=int)  # p[j] = row assigned to column j (0 means free)
+    way = np.zeros(n + 1, dtype=int)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(n + 1, np.inf)
+        used = np.zeros(n + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used
+            free[0] = False
+            # reduced costs from row i0 to every column not yet on the alternating tree
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            better = free[1:] & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+            j1 = np.flatnonzero(free)[np.argmin(minv[free])]
+            delta = minv[j1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        # flip the augmenting path back to the start column
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    return p[1:] - 1
 
 # region row operations
 def SwapRows(A, r1, r2):  #if I do this, it is known as a partial pivot
@@ -40,12 +238,10 @@ def SwapRows(A, r1, r2):  #if I do this, it is known as a partial pivot
     :param r2: index of row 2
     :return: The A matrix after the row swap is done.
     '''
-    rmax=max(r1,r2) #the larger index
-    rmin=min(r1,r2) #the smaller index
-    RMax=A[rmax]  #temporarily store the row vector at rmax in a variable
-    RMin=A.pop(rmin) #pop function removes this row from the matrix and shifts all larger indices by -1
-    A.insert(rmin,RMax) #insert the row RMax at the location rmin.  All higher index rows increase index by +1
-    A[rmax]=RMin  #now, replace row rmax with RMin
+    if _IsArray(A):
+        A[[r1, r2]] = A[[r2, r1]]  #array rows are views, so swap by fancy indexing (copies both rows)
+    else:
+        A[r1], A[r2] = A[r2], A[r1]  #swapping the two row references is O(1), no list shifting
     return A  #done
 
 def MultRow(R,s=1):
@@ -79,55 +275,67 @@ def AddRows(R1, R2, s=1.0):
     #return [round(i+s*j,4) for i, j in zip(R1, R2)]
 # endregion
 
+def _RowReduce(M, reduced=False):
+    '''
+    The elimination engine shared by EchelonForm, ReducedEchelonForm and InvertMatrix.
+    Works in place on the float NumPy array M using partial pivoting: for each column the remaining row with the
+    largest magnitude becomes the pivot row, then all rows below it (and above it too if reduced is True) are
+    updated at once with a single vectorized rank-1 update instead of one AddRows call per row.
+    Entries smaller than a roundoff tolerance (relative to the largest entry) are treated as zero.
+    :param M: an m x n float array, overwritten with its (reduced) echelon form
+    :param reduced: if True, scale pivots to 1 and clear the entries above them as well
+    :return: list of the pivot column indices
+    '''
+    m, n = M.shape
+    tol = max(m, n) * np.finfo(float).eps * (np.abs(M).max() if M.size else 0.0)
+    pivots = []
+    r = 0  #the row where the next pivot goes
+    for j in range(n):
+        if r == m:
+            break
+        p = r + int(np.argmax(np.abs(M[r:, j])))  #partial pivot: largest magnitude in column j
+        if abs(M[p, j]) <= tol:
+            M[r:, j] = 0.0  #no usable pivot in this column
+            continue
+        if p != r:
+            M[[r, p]] = M[[p, r]]
+        if reduced:
+            M[r, j:] /= M[r, j]
+        below = M[r + 1:, j] / M[r, j]
+        M[r + 1:, j:] -= np.outer(below, M[r, j:])
+        M[r + 1:, j] = 0.0
+        if reduced and r > 0:
+            M[:r, j:] -= np.outer(M[:r, j], M[r, j:])
+            M[:r, j] = 0.0
+        pivots.append(j)
+        r += 1
+    return pivots
+
 #the Echelon form of a matrix is when I produce an upper triangular matrix by Gaussian elimination
 def EchelonForm(A):
     '''
     I'm expecting a Matrix of m rows by n columns.
-    This function performs row operations (Gauss elimination) to produce echelon form matrix.
+    This function performs row operations (Gauss elimination with partial pivoting) to produce echelon form matrix.
+    A itself is not changed; the work is done on one float copy.
     :param Matrix: the matrix
     :return: the echelon form of the matrix
     '''
-    m=len(A) #number of rows of A
-    n=len(A[0])  #number of columns of A
-    Ech = CP.deepcopy(A) #make a deep copy of A so that I don't actually change A
-
-    #order the rows by first non-zero in each column
-    for i in range(m):  #iterate through all rows
-        for r in range(i,m):  #iterate through all rows below row i
-            p=FirstNonZero_Index(Ech[r]) #find column index in row r that is non-zero
-            if p==i:  #found a row with non-zero in ith position
-                Ech = SwapRows(Ech, r,i) #move this row to the ith row
-                break #stops iterating through rows below i since I found a suitable row to put in position i
-        if(Ech[i][i] != 0.0): #if I found a non-zero value for the [i][i] pivot
-            for r in range(i+1,m):  #now add multiples of row i to rows i+1 to m in order to make column i values zero below row i
-                p=FirstNonZero_Index(Ech[r])
-                if p==i:  #found row p has a nonzero element in column i
-                    Row=Ech[r]
-                    s=-Ech[r][p]/Ech[i][i]
-                    Ech[r] = AddRows(Row,Ech[i],s)
-    return Ech
+    Ech = np.array(A, dtype=float) #one working copy so that I don't actually change A
+    _RowReduce(Ech)
+    return _Like(Ech, A)
 
 #the reduced echelon form of a matrix is when the numbers along the diagonal are all 1's and rows above all other
 #numbers in the column are zero
 def ReducedEchelonForm(A):
     """
-    This functions first creates an echelon form matrix from A and then calculates a reduced echelon form of A
-    by subsequent row operations.
+    This functions calculates the reduced echelon form of A by row operations (Gauss-Jordan elimination with
+    partial pivoting on a single working copy).
     :param A: The matrix to work on
     :return: The reduced echelon form of the matrix A
     """
-    REF=EchelonForm(A) #first reduce to echelon form
-    for i in range(len(A)-1,-1,-1): #iterate from last row to row 0
-        R=REF[i]
-        j=FirstNonZero_Index(R) #find the first non-zero column in r
-        R=MultRow(R,1.0/R[j]) #make jth value equal to 1.0
-        REF[i]=R
-        for ii in range(i-1,-1,-1): #remember, end index in range is non-inclusive
-            RR=REF[ii]
-            if(RR[j]!=0):
-                RR = AddRows(RR,R,-RR[j])
-                REF[ii]=RR
-    return REF
+    REF = np.array(A, dtype=float)
+    _RowReduce(REF, reduced=True)
+    return _Like(REF, A)
 
 #produce and identity matrix of the same size as A
 def IDMatrix(A):
@@ -138,6 +346,8 @@ def IDMatrix(A):
     '''
     m=len(A) #number of rows
     n=len(A[0]) #number of cols
+    if _IsArray(A):
+        return _Like(np.eye(m, n), A)
     IM=[[1 if j==i else 0 for j in range(n)] for i in range(m)]
     return IM
 
@@ -146,12 +356,17 @@ def AugmentMatrix(A,B):
     '''
     Create an augmented matrix from two matrices
     :param A: a matrix
-    :param B: another matrix
-    :return:
+    :param B: another matrix, or a column vector
+    :return: a new matrix [A|B]; A is copied like the list version (use Matrix.Augment to share A's buffer)
     '''
+    if _IsArray(A):
+        return _Like(np.column_stack((np.asarray(A, dtype=float), B)), A)
     C=CP.deepcopy(A)
     for i in range(len(C)):
-        C[i].append(B[i])
+        if isinstance(B[i], (list, tuple, np.ndarray)):
+            C[i].extend(B[i])  #B is a matrix, append its whole row
+        else:
+            C[i].append(B[i])
     return C
 
 #remove the jth column from matrix A
@@ -160,11 +375,17 @@ def popColumn(A, j):
     I want to remove column j from matrix A.  I'm using slicing to cut out the column j
     :param A: The matrix
     :param j: Index of the column I want to remove
-    :return:  The matrix with column j removed
+    :return:  (the removed column, the matrix with column j removed)
     '''
+    if isinstance(A, Matrix):
+        if j in (-1, A.shape[1] - 1):  #the last column: both parts are views, nothing is copied
+            return A.Col(A.shape[1] - 1), Matrix.Wrap(A._buf, A.shape[1] - 1)
+        return A.Col(j).copy(), Matrix(np.delete(A.Array(), j, axis=1))
+    if _IsArray(A):
+        return A[:, j].copy(), np.delete(A, j, axis=1)
     numRows = len(A)
     AA = dc(A)
-    c=[0]*len(AA[0])  # create a column vector of proper length initially filled with zeros
+    c=[0]*numRows  # create a column vector of proper length initially filled with zeros
     for rowIndex in range(numRows):
         c[rowIndex]=AA[rowIndex].pop(j)
     return c, AA
@@ -177,6 +398,8 @@ def insertColumn(A,b, i):
     :param i: the index where to insert b
     :return: the new matrix with b inserted
     '''
+    if _IsArray(A):
+        return _Like(np.insert(np.asarray(A), i, b, axis=1), A)
     ANew = dc(A)
     for r in range(len(ANew)):
         newRow = dc(ANew[r])
@@ -192,8 +415,11 @@ def replaceColumn(A,b,i):
     :param i: the column index of column to replace
     :return: a new matrix with the new column
     '''
-    ANew = dc(A)
-    ANew = popColumn(ANew,i)
+    if _IsArray(A):
+        ANew = np.array(A, dtype=float)  #for a Matrix, A.Col(i)[:] = b replaces the column in place instead
+        ANew[:, i] = b
+        return _Like(ANew, A)
+    c, ANew = popColumn(A,i)
     ANew = insertColumn(ANew,b,i)
     return ANew
 
@@ -205,42 +431,35 @@ def InvertMatrix(A):
     :param A:  the matrix to invert
     :return:  the inverted matrix
     """
-    ID = IDMatrix(A)
-    Ainv = AugmentMatrix(A, ID)
-    IAinv = ReducedEchelonForm(Ainv)
-    for j in range(len(ID[0])-1, -1, -1):
-        IAinv = popColumn(IAinv, j)
-    return IAinv
+    n = len(A)
+    IAinv = np.hstack((np.array(A, dtype=float), np.eye(n)))  #the augmented matrix [A|I]
+    pivots = _RowReduce(IAinv, reduced=True)
+    if pivots[:n] != list(range(n)):
+        raise ValueError("Matrix is singular and has no inverse.")
+    return _Like(IAinv[:, n:], A)
 
 #use this to multiply matrices of correct dimensions
-def MatrixMultiply(A,B):
+def MatrixMultiply(A,B,ndigits=None):
     '''
     For multiplication of matrices, I need mXn * nXp to give a mXp matrix.
     So, must first check number of cols of A equals number of rows of B.
-    Then, do matrix multiplication.
+    Then, do matrix multiplication.  The product is computed by NumPy's matmul, which hands it to the BLAS
+    library (cache-blocked and multithreaded) instead of a Python triple loop.
     :param A: A mxn matrix
     :param B: A nxp matrix
+    :param ndigits: if given, round every entry of the result to this many decimals (off by default so that
+                    chained products keep full precision)
     :return: A matrix of shape mxp
     '''
-    m=len(A)
-    n=len(A[0])
-    nn=len(B)
-    p=len(B[0])
-    SizeOk = n == nn
-    if not SizeOk:
-        return A
-    C=[0]*m
-    for i in range(p):
-        C[i] = [0]*p
-    #below is a shorter notation for building a list called a list comrehension
-    #C=[[0 for j in range(p)] for m in range(m)] #build an initial array full of zeros of size ARowsXBCols
-
-    for i in range(len(C)):  # i is my row counting variable in C
-        for j in range(len(C[i])):  # j is my column counting variable in C
-            for k in range(len(A[i])): #multiply row i from A with column j from B
-                C[i][j] +=A[i][k]*B[k][j]
-            C[i][j] = round(C[i][j], 3)
-    return C
+    AA = np.asarray(A, dtype=float)
+    BB = np.asarray(B, dtype=float)
+    if AA.ndim != 2 or BB.ndim != 2 or AA.shape[1] != BB.shape[0]:
+        raise ValueError("Cannot multiply a {} matrix by a {} matrix.".format(
+            "x".join(map(str, AA.shape)), "x".join(map(str, BB.shape))))
+    C = AA @ BB
+    if ndigits is not None:
+        C = np.round(C, ndigits)
+    return _Like(C, A)
 
 def main():
     #assuming [A][x]=[b] and augmented matrix is [M]=[A|b]
@@ -261,7 +480,7 @@ def main():
         print(r)
 
     #for solving [A][x]=[b]
-    A=popColumn(M, len(M[0]) - 1) #remove last column of augmented matrix M
+    b, A = popColumn(M, len(M[0]) - 1) #remove last column of augmented matrix M
 
     MI=InvertMatrix(A)
 
@@ -269,7 +488,7 @@ def main():
     for r in MI:
         print(r)
 
-    B=MatrixMultiply(A,MI)
+    B=MatrixMultiply(A,MI,ndigits=3)
 
     print("A^-1*A")
     for r in B:
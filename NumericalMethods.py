@@ -1,14 +1,32 @@
 #region imports
 import Gauss_Elim as GE  # this is the module that has useful matrix manipulation functions
-from math import sqrt, pi, exp
+from math import sqrt, pi, exp, erfc
+from functools import lru_cache
+from collections import OrderedDict
+import heapq
+import numpy as np
+from Quadrature import GaussLegendre, AdaptiveGaussKronrod
+try:
+    import scipy.sparse as sp
+    from scipy.sparse.linalg import splu
+except ImportError:  # only the incomplete Cholesky preconditioner of ConjugateGradient needs SciPy
+    sp = None
 #endregion
 
 
 #region function definitions
-def Probability(PDF, args, c, GT=True):
+def Probability(PDF, args, c, GT=True, mode="simpson"):
     """
     Return P(X > c) if GT is True, otherwise P(X < c), using Simpson's rule over a finite normal range.
+    mode selects how the answer is computed:
+      "simpson": integrate PDF numerically (matches the results used in hw2a/hw2c)
+      "gauss":   integrate PDF over the same range with a 20-node Gauss-Legendre rule (5x fewer PDF calls)
+      "exact":   closed form through erfc; PDF must be GPDF
+      "auto":    "exact" when PDF is GPDF, otherwise "simpson"
     """
+    if _UseExact(PDF, mode):
+        return float(_GaussianTail(args, c, GT))
+
     mu, sig = args
 
     # choose integration limits: mu ± 5σ catches essentially all probability mass
@@ -32,22 +50,112 @@ def Probability(PDF, args, c, GT=True):
     if a >= b:
         return 0.0
 
-    p = Simpson(PDF, (mu, sig, a, b))
+    p = (GaussLegendre if mode == "gauss" else Simpson)(PDF, (mu, sig, a, b))
     return p
 
 
+def ProbabilityBatch(PDF, args, c, GT=True, N=100, blockSize=4096, mode="simpson", tableN=2000):
+    """
+    Batched version of Probability.  c, mu and sig (args = (mu, sig)) may be arrays and GT may be an array of
+    booleans; they broadcast together and an array of the same shape holding P(X > c) or P(X < c) is returned.
+    PDF must accept NumPy arrays of x (like GPDF).
+    mode is "simpson", "gauss", "exact" or "auto" as in Probability (N only applies to "simpson"), and gives
+    the same values as Probability: each point is integrated over its own interval, all with the same node
+    template in vectorized blocks of blockSize points (N + 1 PDF calls per point for "simpson").
+    mode="table" shares one cumulative grid per (mu, sig) instead: a group large enough to pay for it builds
+    a GaussianCDFTable with tableN panels (2*tableN + 1 PDF calls for the whole group) and every c in the
+    group is an interpolation, which differs from the "simpson" values by up to ~1e-8 (see
+    GaussianCDFTable.ErrorBound); smaller groups are integrated with Simpson as above.
+    :return: a float if every input was a scalar, otherwise an array
+    """
+    mu, sig = args
+    mu, sig, c, GT = np.broadcast_arrays(np.asarray(mu, dtype=float), np.asarray(sig, dtype=float),
+                                         np.asarray(c, dtype=float), np.asarray(GT, dtype=bool))
+    if mode != "table" and _UseExact(PDF, mode):
+        p = _GaussianTail((mu, sig), c, GT)
+        return float(p) if p.ndim == 0 else p
+
+    p = np.empty(c.shape)
+    pFlat = p.reshape(-1)
+    muF, sigF, cF, GTF = (v.ravel() for v in (mu, sig, c, GT))
+
+    rest = np.arange(pFlat.size)
+    if mode == "table":
+        # shared grids for the (mu, sig) groups where 2*tableN + 1 PDF calls beat N + 1 per point
+        pairs, group = np.unique(np.column_stack((muF, sigF)), axis=0, return_inverse=True)
+        group = group.ravel()
+        counts = np.bincount(group)
+        for g in np.flatnonzero(counts * (N + 1) > 2 * tableN + 1):
+            idx = np.flatnonzero(group == g)
+            table = GaussianCDFTable(pairs[g, 0], pairs[g, 1], PDF, tableN)
+            pFlat[idx] = np.where(GTF[idx], table.Probability(cF[idx], True), table.CDF(cF[idx]))
+        rest = np.flatnonzero(counts[group] * (N + 1) <= 2 * tableN + 1)
+
+    # same limits and clamping as Probability, applied element-wise
+    muR, sigR, cR, GTR = muF[rest], sigF[rest], cF[rest], GTF[rest]
+    left = muR - 5 * sigR
+    right = muR + 5 * sigR
+    a = np.maximum(np.where(GTR, cR, left), left)
+    b = np.minimum(np.where(GTR, right, cR), right)
+    b = np.maximum(a, b)  # an empty interval has zero width and so integrates to exactly 0
+
+    flat = (muR, sigR, a, b)
+    for start in range(0, rest.size, blockSize):
+        block = slice(start, start + blockSize)
+        blockArgs = tuple(v[block] for v in flat)
+        if mode == "gauss":
+            pFlat[rest[block]] = GaussLegendre(PDF, blockArgs, vectorized=True)
+        else:
+            pFlat[rest[block]] = Simpson(PDF, blockArgs, N, vectorized=True)
+    return float(p) if p.ndim == 0 else p
+
+
+def _UseExact(PDF, mode):
+    """
+    Decide between the erfc closed form and numerical integration for the Probability functions.
+    """
+    if mode in ("simpson", "gauss"):
+        return False
+    if mode == "auto":
+        return PDF is GPDF
+    if mode == "exact":
+        if PDF is not GPDF:
+            raise ValueError("mode='exact' is only available for the Gaussian PDF (GPDF).")
+        return True
+    raise ValueError("mode must be 'exact', 'simpson', 'gauss' or 'auto', not {!r}.".format(mode))
+
+
+# element-wise math.erfc for arrays; exact to double precision even far out in the tails
+_erfcArray = np.vectorize(erfc, otypes=[float])
+
+
+def _GaussianTail(args, c, GT):
+    """
+    Closed-form P(X > c) (GT True) or P(X < c) for X ~ N(mu, sig); works on scalars and arrays.
+    Using erfc for both tails avoids the cancellation of 1 - CDF, so tiny tail probabilities keep full accuracy.
+    """
+    mu, sig = args
+    z = (np.asarray(c, dtype=float) - mu) / (sig * sqrt(2.0))
+    return 0.5 * _erfcArray(np.where(GT, z, -z))
+
+
 def GPDF(args):
     """
     Evaluate the Gaussian PDF at x for mean mu and standard deviation sig.
     """
     x, mu, sig = args
-    fx = (1.0 / (sig * sqrt(2.0 * pi))) * exp(-0.5 * ((x - mu) / sig) ** 2)
+    # math.exp is much faster for scalars, np.exp lets the vectorized Simpson pass whole node arrays
+    ex = np.exp if isinstance(x, np.ndarray) else exp
+    fx = (1.0 / (sig * sqrt(2.0 * pi))) * ex(-0.5 * ((x - mu) / sig) ** 2)
     return fx
 
 
-def Simpson(fn, args, N=100):
+def Simpson(fn, args, N=100, vectorized=False):
     """
     Apply Simpson's 1/3 rule to integrate fn from a to b with args = (mu, sig, a, b).
+    With vectorized=True, fn is called once with (x, mu, sig) where x is a NumPy array of nodes and must
+    return an array of the same shape.  mu, sig, a and b may then be arrays (they broadcast together) and
+    an array of integrals of their common shape is returned.
     """
     mu, sig, a, b = args
 
@@ -55,6 +163,9 @@ def Simpson(fn, args, N=100):
     if N % 2 == 1:
         N += 1
 
+    if vectorized:
+        return _SimpsonVectorized(fn, mu, sig, a, b, N)
+
     h = (b - a) / float(N)
 
     fsum_odd = 0.0
@@ -76,6 +187,318 @@ def Simpson(fn, args, N=100):
     return area
 
 
+def Integrate(fn, args, method="simpson", N=None, vectorized=False, tol=1e-10):
+    """
+    Integrate fn from a to b with args = (mu, sig, a, b), the call shape of Simpson, by the chosen method:
+      "simpson": Simpson's rule with N panels (default 100)
+      "gauss":   N-node Gauss-Legendre (default 20), exact for polynomials of degree 2N-1
+      "kronrod": adaptive Gauss-Kronrod 7/15 to the absolute tolerance tol (scalar a and b only)
+    vectorized has the meaning it has in Simpson.
+    """
+    if method == "simpson":
+        return Simpson(fn, args, 100 if N is None else N, vectorized)
+    if method == "gauss":
+        return GaussLegendre(fn, args, 20 if N is None else N, vectorized)
+    if method == "kronrod":
+        mu, sig, a, b = args
+        return AdaptiveGaussKronrod(lambda x: fn((x, mu, sig)), a, b, tol, vectorized=vectorized)[0]
+    raise ValueError("method must be 'simpson', 'gauss' or 'kronrod', not {!r}.".format(method))
+
+def AdaptiveSimpson(fn, args, tol=1e-8, maxEval=10000):
+    """
+    Adaptive Simpson's rule to integrate fn from a to b with args = (mu, sig, a, b).
+    Each panel carries an error estimate (S_fine - S_coarse)/15 from its 3- and 5-point Simpson values.  The panel
+    with the largest estimate is split in half until the summed estimate is below tol or another split would
+    exceed maxEval evaluations of fn, so smooth integrands stop after a few dozen evaluations.
+    :return: (area, error estimate, number of fn evaluations)
+    """
+    mu, sig, a, b = args
+
+    def f(x):
+        return fn((x, mu, sig))
+
+    def panel(a, b, fa, fm, fb):
+        # two new evaluations at the quarter points give the 5-point (fine) Simpson value
+        fl = f(0.75 * a + 0.25 * b)
+        fr = f(0.25 * a + 0.75 * b)
+        h = b - a
+        coarse = h / 6.0 * (fa + 4.0 * fm + fb)
+        fine = h / 12.0 * (fa + 4.0 * fl + 2.0 * fm + 4.0 * fr + fb)
+        err = (fine - coarse) / 15.0
+        # heap entries are ordered by -|err| so the worst panel pops first
+        return (-abs(err), a, b, fa, fl, fm, fr, fb, fine + err)
+
+    heap = [panel(a, b, f(a), f(0.5 * (a + b)), f(b))]
+    nEval = 5
+    errSum = -heap[0][0]
+    while errSum > tol and nEval + 4 <= maxEval:
+        negErr, a, b, fa, fl, fm, fr, fb, area = heapq.heappop(heap)
+        m = 0.5 * (a + b)
+        left = panel(a, m, fa, fl, fm)
+        right = panel(m, b, fm, fr, fb)
+        nEval += 4
+        errSum += negErr - left[0] - right[0]
+        heapq.heappush(heap, left)
+        heapq.heappush(heap, right)
+
+    area = sum(p[-1] for p in heap)
+    errEst = sum(-p[0] for p in heap)
+    return area, errEst, nEval
+
+
+@lru_cache(maxsize=32)
+def _SimpsonWeights(N):
+    """
+    Return the Simpson 1/3 weight vector [1, 4, 2, 4, ..., 2, 4, 1] for an even N (read-only, cached per N).
+    """
+    w = np.full(N + 1, 2.0)
+    w[1::2] = 4.0
+    w[0] = w[-1] = 1.0
+    w.flags.writeable = False
+    return w
+
+
+def _SimpsonVectorized(fn, mu, sig, a, b, N):
+    """
+    Simpson's 1/3 rule for every (mu, sig, a, b) at once with a single call to fn.
+    """
+    mu, sig, a, b = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (mu, sig, a, b)))
+    h = (b - a) / float(N)
+
+    # the node offsets 0..N are shared by every interval, only the shift a and the step h differ
+    x = a[..., None] + h[..., None] * np.arange(N + 1)
+    fx = fn((x, mu[..., None], sig[..., None]))
+
+    area = (h / 3.0) * (fx @ _SimpsonWeights(N))
+    return float(area) if area.ndim == 0 else area
+
+
+def GaussianQuantile(P, args=(0.0, 1.0), case="left", xtol=1e-14, maxiter=10):
+    """
+    Return c such that the chosen probability of N(mu, sig) equals P (inverse of Probability with GPDF):
+      "left":    P(x < c) = P
+      "right":   P(x > c) = P
+      "central": P(mu-(c-mu) < x < mu+(c-mu)) = P
+      "outside": P(x < mu-(c-mu) or x > mu+(c-mu)) = P
+    P, mu and sig (args = (mu, sig)) may be arrays; they broadcast together and an array of c is returned.
+    Every case reduces to the standard normal lower-tail quantile z of some q <= 0.5, and c = mu ± sig*z.
+    z is solved once per distinct q (so many processes sharing a target cost one solve) by Halley steps that
+    use the known PDF as the derivative, starting from the Abramowitz & Stegun 26.2.23 approximation;
+    3 steps usually reach double precision.
+    """
+    P = np.asarray(P, dtype=float)
+    if np.any((P <= 0.0) | (P >= 1.0)):
+        raise ValueError("Probabilities must be between 0 and 1 (exclusive).")
+
+    # lower-tail probability q and the side of the mean the answer lies on
+    if case == "left":
+        q, side = np.minimum(P, 1.0 - P), np.where(P <= 0.5, 1.0, -1.0)
+    elif case == "right":
+        q, side = np.minimum(P, 1.0 - P), np.where(P <= 0.5, -1.0, 1.0)
+    elif case == "central":
+        q, side = 0.5 * (1.0 - P), -1.0
+    elif case == "outside":
+        q, side = 0.5 * P, -1.0
+    else:
+        raise ValueError("case must be 'left', 'right', 'central' or 'outside', not {!r}.".format(case))
+
+    qUnique, where = np.unique(q, return_inverse=True)
+    z = _StdNormalLowerQuantile(qUnique, xtol, maxiter)[where].reshape(q.shape)
+
+    mu, sig = args
+    c = mu + side * sig * z
+    return float(c) if np.ndim(c) == 0 else c
+
+
+def _StdNormalLowerQuantile(q, xtol, maxiter):
+    """
+    Solve Phi(z) = q for an array of 0 < q <= 0.5 (so z <= 0), masking off targets as they converge.
+    """
+    t = np.sqrt(-2.0 * np.log(q))
+    z = -(t - (2.515517 + 0.802853 * t + 0.010328 * t * t)
+          / (1.0 + 1.432788 * t + 0.189269 * t * t + 0.001308 * t ** 3))
+
+    active = np.arange(q.size)
+    for _ in range(maxiter):
+        za = z[active]
+        # for z <= 0, 0.5*erfc(-z/sqrt(2)) keeps full relative precision even for tiny q
+        dz = (0.5 * _erfcArray(-za / sqrt(2.0)) - q[active]) / GPDF((za, 0.0, 1.0))
+        z[active] = za - dz / (1.0 + 0.5 * za * dz)  # Halley: Phi'' / Phi' = -z
+        active = active[np.abs(dz) > xtol * (1.0 + np.abs(za))]
+        if active.size == 0:
+            break
+    return z
+
+
+class GaussianCDFTable:
+    """
+    Cumulative distribution table for one (mu, sig), built once so that repeated CDF queries cost an
+    interpolation instead of a quadrature.  The table covers mu ± 5σ like Probability: F is measured from
+    mu - 5σ and clamped to 0 and F[-1] outside the range, and the Probability method counts P(X > c) as the
+    mass between c and mu + 5σ, so both tails answer the same integrals as Probability(PDF, (mu, sig), c, GT).
+    Building integrates each of the N panels with Simpson's rule (one vectorized PDF call) and stores F and
+    f at every node.  Queries use cubic Hermite interpolation between the two neighbouring nodes; the grid is
+    uniform, so the node index is computed directly and a query costs O(1) for any table size.
+    ErrorBound is a bound on the error of CDF and Probability against the untruncated distribution:
+        h^4 * (max|f^(3)| / 384 + (b - a) * max|f^(4)| / 2880) + tail
+    (interpolation plus accumulated Simpson error, with the derivatives estimated from the tabulated f, plus
+    the probability mass outside mu ± 5σ, which the table leaves out).  The tail mass is exact for GPDF
+    (2Φ(-5) = 5.7e-7, which dominates); for another PDF each tail is estimated as that of a Gaussian with the
+    same density at the cut-off.  For the default N=2000 the numerical part is about 4e-12.
+    """
+    __slots__ = ("mu", "sig", "left", "right", "h", "F", "f", "ErrorBound")
+
+    def __init__(self, mu, sig, PDF=None, N=2000):
+        """
+        :param mu: population mean
+        :param sig: population standard deviation
+        :param PDF: density called as PDF((x_array, mu, sig)); defaults to GPDF
+        :param N: number of table panels
+        """
+        PDF = GPDF if PDF is None else PDF
+        self.mu, self.sig = float(mu), float(sig)
+        self.left = self.mu - 5.0 * self.sig
+        self.right = self.mu + 5.0 * self.sig
+        self.h = (self.right - self.left) / N
+
+        # nodes at every half step: even entries are table nodes, odd entries are panel midpoints
+        x = self.left + 0.5 * self.h * np.arange(2 * N + 1)
+        fx = PDF((x, self.mu, self.sig))
+        panels = (self.h / 6.0) * (fx[0:-1:2] + 4.0 * fx[1::2] + fx[2::2])
+        self.F = np.concatenate(([0.0], np.cumsum(panels)))
+        self.f = fx[::2]
+
+        d3 = np.abs(np.diff(self.f, 3)).max() / self.h ** 3
+        d4 = np.abs(np.diff(self.f, 4)).max() / self.h ** 4
+        if PDF is GPDF:
+            tail = 2.0 * float(_GaussianTail((self.mu, self.sig), self.right, True))
+        else:
+            # a Gaussian with density f at 5σ has tail mass f * sig * Φ(-5) / φ(5)
+            tail = (self.f[0] + self.f[-1]) * self.sig * float(_GaussianTail((0.0, 1.0), 5.0, True)) \
+                / GPDF((5.0, 0.0, 1.0))
+        self.ErrorBound = self.h ** 4 * (d3 / 384.0 + (self.right - self.left) * d4 / 2880.0) + tail
+
+    def CDF(self, x):
+        """
+        Return P(X < x) from the table; x may be a scalar or an array.
+        """
+        xa = np.asarray(x, dtype=float)
+        u = (np.clip(xa, self.left, self.right) - self.left) / self.h
+        k = np.minimum(u.astype(int), len(self.F) - 2)
+        t = u - k
+        # cubic Hermite basis on [x_k, x_k+1] using the exact slopes F' = f
+        t2 = t * t
+        t3 = t2 * t
+        F = ((2.0 * t3 - 3.0 * t2 + 1.0) * self.F[k] + (t3 - 2.0 * t2 + t) * self.h * self.f[k]
+             + (3.0 * t2 - 2.0 * t3) * self.F[k + 1] + (t3 - t2) * self.h * self.f[k + 1])
+        return float(F) if F.ndim == 0 else F
+
+    def Probability(self, c, GT=True):
+        """
+        Return P(X > c) if GT is True, otherwise P(X < c), like Probability(GPDF, (mu, sig), c, GT).
+        """
+        F = self.CDF(c)
+        return self.F[-1] - F if GT else F
+
+
+class LRUCache:
+    """
+    Opt-in, bounded least-recently-used memoization for pure functions such as Probability and GPDF.
+    Wrap a function and call the wrapper instead: CachedP = LRUCache(Probability, maxsize=512).
+    Arguments are canonicalized before lookup: every number (int, float, NumPy scalar) becomes a float with
+    -0.0 folded into 0.0, tuples and lists are canonicalized element-wise, and with ndigits set floats are
+    rounded to that many significant digits so that values differing only in the last bits share an entry.
+    A call with an array argument (such as GPDF on an array of x) is passed straight to fn without caching.
+    Hits, misses, evictions and bypassed calls are counted so the cache can be sized from Stats().
+    """
+    __slots__ = ("fn", "maxsize", "ndigits", "hits", "misses", "evictions", "bypassed", "_store")
+
+    def __init__(self, fn, maxsize=1024, ndigits=None):
+        """
+        :param fn: the function to memoize; its arguments must be numbers, sequences of them or hashable objects
+        :param maxsize: largest number of stored results before the least recently used one is evicted
+        :param ndigits: significant digits kept in float keys (None keeps the full value)
+        """
+        self.fn = fn
+        self.maxsize = maxsize
+        self.ndigits = ndigits
+        self._store = OrderedDict()
+        self.hits = self.misses = self.evictions = self.bypassed = 0
+
+    def __call__(self, *args, **kwargs):
+        key = self._Key(args)
+        if kwargs:
+            key = (key, self._Key(tuple(sorted(kwargs.items()))))
+        try:
+            hash(key)
+        except TypeError:  # an array (or another unhashable value) among the arguments
+            self.bypassed += 1
+            return self.fn(*args, **kwargs)
+        try:
+            value = self._store[key]
+        except KeyError:
+            self.misses += 1
+            value = self.fn(*args, **kwargs)
+            self._store[key] = value
+            self._Trim()
+        else:
+            self.hits += 1
+            self._store.move_to_end(key)
+        return value
+
+    def _Key(self, v):
+        """
+        Canonical, hashable form of an argument.
+        """
+        if isinstance(v, (tuple, list)):
+            return tuple(self._Key(item) for item in v)
+        if isinstance(v, np.ndarray) and v.ndim == 0:
+            v = v[()]  # a 0-d array is a scalar
+        if isinstance(v, (bool, np.bool_)):
+            return bool(v)
+        if isinstance(v, (int, float, np.integer, np.floating)):
+            v = float(v) + 0.0  # adding 0.0 turns -0.0 into 0.0
+            if v != v:
+                return "nan"  # nan != nan would never hit
+            if self.ndigits is not None:
+                v = float("{:.{}e}".format(v, self.ndigits - 1))
+            return v
+        return v
+
+    def _Trim(self):
+        while len(self._store) > self.maxsize:
+            self._store.popitem(last=False)
+            self.evictions += 1
+
+    def Resize(self, maxsize):
+        """
+        Change the size limit, evicting least recently used entries if it shrank.
+        """
+        self.maxsize = maxsize
+        self._Trim()
+
+    def Clear(self):
+        """
+        Drop every stored result and reset the counters.
+        """
+        self._store.clear()
+        self.hits = self.misses = self.evictions = self.bypassed = 0
+
+    def Stats(self):
+        """
+        Return a dict with hits, misses, evictions, bypassed, size, maxsize and hitRate (of the cached calls).
+        """
+        calls = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "bypassed": self.bypassed,
+                "size": len(self._store), "maxsize": self.maxsize,
+                "hitRate": self.hits / calls if calls else 0.0}
+
+
+# ready-made opt-in caches for the common entry points; the plain functions stay uncached
+CachedProbability = LRUCache(Probability, maxsize=1024)
+CachedGPDF = LRUCache(GPDF, maxsize=4096)
+
+
 def Secant(fcn, x0, x1, maxiter=10, xtol=1e-5):
     """
     Use the Secant Method to approximate a root of fcn(x) near x0 and x1.
@@ -100,32 +523,388 @@ def Secant(fcn, x0, x1, maxiter=10, xtol=1e-5):
     return x1, iter_count  # return (root, iterations) after maxiter
 
 
-def GaussSeidel(Aaug, x, Niter=15):
+def SecantBatch(fcn, x0, x1, args=(), maxiter=10, xtol=1e-5):
     """
-    Use Gauss-Seidel method to solve Ax=b from augmented matrix [A|b].
+    Vectorized Secant Method for many independent root problems at once.
+    fcn(x, *args) takes an array of x (one entry per problem) and returns an array of residuals; each array in
+    args holds one parameter value per problem and is sliced along with x, so fcn only ever sees the problems
+    that are still iterating.  Each problem follows exactly the steps Secant would take: it stops when
+    |x2 - x1| < xtol, when f1 - f0 == 0 (returning x1) or after maxiter iterations.
+    :param x0, x1: arrays (or scalars) of starting pairs, broadcast against each other and args
+    :return: (array of roots, array of iteration counts per problem)
     """
-    # Step 1: make diagonally dominant (call in-place, don't assign)
-    GE.MakeDiagDom(Aaug)
+    args = tuple(np.asarray(a) for a in args)
+    x0, x1, *args = np.broadcast_arrays(np.asarray(x0, dtype=float), np.asarray(x1, dtype=float), *args)
+    shape = x0.shape
+    x0, x1 = x0.ravel().copy(), x1.ravel().copy()
+    args = [a.ravel() for a in args]
+
+    roots = x1.copy()
+    iters = np.zeros(x1.size, dtype=int)
+    active = np.arange(x1.size)
+    f0 = np.asarray(fcn(x0, *args), dtype=float)
+    f1 = np.asarray(fcn(x1, *args), dtype=float)
 
-    n_rows = len(Aaug)
-    n_cols = len(Aaug[0])  # last column is b
+    for k in range(maxiter):
+        iters[active] += 1
+        denom = f1 - f0
+        stalled = denom == 0.0
+        roots[active[stalled]] = x1[stalled]
 
-    for iteration in range(Niter):
-        for i in range(n_rows):
-            # right hand side = b value for this equation
-            rhs = Aaug[i][n_cols - 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x2 = x1 - f1 * (x1 - x0) / denom
+        done = np.abs(x2 - x1) < xtol
+        roots[active[done & ~stalled]] = x2[done & ~stalled]
+
+        # keep only the problems that are still iterating
+        keep = ~(done | stalled)
+        active = active[keep]
+        if active.size == 0:
+            break
+        x0, x1, f0 = x1[keep], x2[keep], f1[keep]
+        f1 = np.asarray(fcn(x1, *(a[active] for a in args)), dtype=float)
+        roots[active] = x1  # current estimate if maxiter is reached
+
+    return roots.reshape(shape), iters.reshape(shape)
+
+
+class RootResult:
+    """
+    Outcome of Brent: root, iterations, function evaluations (nfev), final residual f(root), whether the
+    tolerance was met (converged) and whether a sign-change bracket was used (bracketed).
+    """
+    __slots__ = ("root", "iterations", "nfev", "residual", "converged", "bracketed")
 
-            # subtract all other terms A[i,j]*x[j] where j != i
-            for j in range(n_cols - 1):  # all A columns
-                if j != i:
-                    rhs -= Aaug[i][j] * x[j]
+    def __init__(self, root, iterations, nfev, residual, converged, bracketed):
+        self.root = root
+        self.iterations = iterations
+        self.nfev = nfev
+        self.residual = residual
+        self.converged = converged
+        self.bracketed = bracketed
 
-            # solve for x[i]: x[i] = rhs / A[i,i]
-            x[i] = rhs / Aaug[i][i]
+    def __repr__(self):
+        return ("RootResult(root={!r}, iterations={}, nfev={}, residual={!r}, converged={}, bracketed={})"
+                .format(self.root, self.iterations, self.nfev, self.residual, self.converged, self.bracketed))
+
+
+def Brent(fcn, x0, x1, maxiter=50, xtol=1e-10, ftol=0.0):
+    """
+    Safeguarded root finder with the same call shape as Secant that reports whether it actually converged.
+    If fcn(x0) and fcn(x1) differ in sign, Brent's method is used: inverse quadratic interpolation or secant
+    steps while they make progress, bisection otherwise, and the root always stays bracketed.  Otherwise secant
+    steps are taken from (x0, x1) until a sign change appears, at which point it switches to the bracketed
+    method.  A flat secant step (f1 == f0) ends the unbracketed search with converged=False instead of
+    silently returning.
+    :param xtol: converged when the bracket (or the last secant step) is narrower than this
+    :param ftol: also converged when |f(x)| <= ftol
+    :return: a RootResult
+    """
+    x0, x1 = float(x0), float(x1)
+    f0, f1 = fcn(x0), fcn(x1)
+    nfev = 2
+
+    # unbracketed phase: secant steps until a sign change brackets the root
+    it = 0
+    while f0 * f1 > 0.0:
+        if it >= maxiter:
+            return RootResult(x1, it, nfev, f1, abs(f1) <= ftol, False)
+        it += 1
+        if f1 == f0:
+            return RootResult(x1, it, nfev, f1, abs(f1) <= ftol, False)
+        x2 = x1 - f1 * (x1 - x0) / (f1 - f0)
+        f2 = fcn(x2)
+        nfev += 1
+        if abs(x2 - x1) < xtol or abs(f2) <= ftol:
+            return RootResult(x2, it, nfev, f2, True, False)
+        x0, f0, x1, f1 = x1, f1, x2, f2
+
+    # bracketed phase (Brent): b is the best estimate, c the contrapoint with f(c) of opposite sign,
+    # a the previous estimate
+    a, fa, b, fb = x0, f0, x1, f1
+    c, fc = b, fb
+    d = e = b - a
+    while True:
+        if (fb > 0.0) == (fc > 0.0):
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, fa = b, fb
+            b, fb = c, fc
+            c, fc = a, fa
+        tol = 2.0 * 2.220446049250313e-16 * abs(b) + 0.5 * xtol
+        m = 0.5 * (c - b)
+        if abs(m) <= tol or fb == 0.0 or abs(fb) <= ftol:
+            return RootResult(b, it, nfev, fb, True, True)
+        if it >= maxiter:
+            return RootResult(b, it, nfev, fb, False, True)
+        it += 1
+
+        if abs(e) >= tol and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:  # secant step
+                p = 2.0 * m * s
+                q = 1.0 - s
+            else:  # inverse quadratic interpolation
+                q = fa / fc
+                r = fb / fc
+                p = s * (2.0 * m * q * (q - r) - (b - a) * (r - 1.0))
+                q = (q - 1.0) * (r - 1.0) * (s - 1.0)
+            if p > 0.0:
+                q = -q
+            p = abs(p)
+            # accept the interpolation only if it stays well inside the bracket and shrinks it fast enough
+            if 2.0 * p < min(3.0 * m * q - abs(tol * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = m
+        else:
+            d = e = m  # bisection
+
+        a, fa = b, fb
+        b += d if abs(d) > tol else (tol if m > 0.0 else -tol)
+        fb = fcn(b)
+        nfev += 1
+
+
+def _IterativeSetup(Aaug, x):
+    """
+    Common start of GaussSeidel and SOR: reorder the rows of [A|b] with MakeDiagDom (in place, except that a
+    Matrix is reordered as a copy because it may be a view from Augment sharing its rows with A), split it into
+    float arrays and refuse a zero diagonal, which every row update divides by.
+    :return: (A, b, diag(A), x as a float array, ||b|| or 1 if b = 0)
+    """
+    M = np.array(Aaug, dtype=float)
+    if isinstance(Aaug, GE.Matrix):
+        GE.MakeDiagDom(M)
+    else:
+        GE.MakeDiagDom(Aaug)
+        M = np.array(Aaug, dtype=float)
+    A = M[:, :-1]  # last column is b
+    b = M[:, -1]
+    diag = A.diagonal().copy()
+    if np.any(diag == 0.0):
+        raise ValueError("Zero on the diagonal after MakeDiagDom; the row updates would divide by it.")
+    bNorm = np.linalg.norm(b)
+    return A, b, diag, np.array(x, dtype=float), bNorm if bNorm > 0.0 else 1.0
+
+
+def _IterationDone(A, b, xa, bNorm, step, rtol, xtol, residuals):
+    """
+    Common stopping rule of GaussSeidel and SOR: record the relative residual of this sweep and return True
+    once it is below rtol or the largest change of x in the sweep (step) is below xtol * max|x|.
+    """
+    residuals.append(np.linalg.norm(b - A @ xa) / bNorm)
+    return residuals[-1] <= rtol or step <= xtol * np.abs(xa).max()
 
+
+def _StoreSolution(x, xa):
+    """
+    Copy the solution back into the caller's x (a list or an array) and return x.
+    """
+    x[:] = xa.tolist() if isinstance(x, list) else xa
     return x
 
 
+def GaussSeidel(Aaug, x, Niter=15, rtol=1e-12, xtol=1e-12, history=False):
+    """
+    Use Gauss-Seidel method to solve Ax=b from augmented matrix [A|b].
+    A and b are copied once into NumPy arrays and each row update is a vectorized dot product.  Niter is the
+    largest number of sweeps; iteration stops early once the relative residual ||b - Ax|| / ||b|| is below rtol
+    or the largest change of x in a sweep is below xtol * max|x|.  Use rtol = xtol = 0 to always run Niter sweeps.
+    x is updated in place and returned; with history=True the relative residual after each sweep is returned
+    too, as (x, history).
+    """
+    # Step 1: make diagonally dominant (Aaug is reordered in place) and split [A|b]
+    A, b, diag, xa, bNorm = _IterativeSetup(Aaug, x)
+    residuals = []
+    for iteration in range(Niter):
+        step = 0.0
+        for i in range(len(b)):
+            # x[i] = (b[i] - sum_{j != i} A[i,j]*x[j]) / A[i,i], written as a correction to the current x[i]
+            dx = (b[i] - A[i] @ xa) / diag[i]
+            xa[i] += dx
+            step = max(step, abs(dx))
+        if _IterationDone(A, b, xa, bNorm, step, rtol, xtol, residuals):
+            break
+
+    _StoreSolution(x, xa)
+    return (x, residuals) if history else x
+
+
+def SOR(Aaug, x, omega=None, Niter=500, rtol=1e-12, xtol=1e-12, history=False, maxTuneSweeps=50,
+        divergence=1e3):
+    """
+    Successive over-relaxation for Ax=b from augmented matrix [A|b], the over-relaxed version of GaussSeidel.
+    The rows are first split into colour classes so that no row depends on another row of its own class
+    (red-black ordering for 5-point/tridiagonal diffusion stencils, found by greedy graph colouring in
+    general).  Each class is then updated with one vectorized step, x[C] += omega*(b[C] - A[C] x)/diag(A)[C],
+    which is exactly the Gauss-Seidel update of those rows.  If there are nearly as many classes as rows
+    (dense coupling) the plain row-by-row sweep is used instead.
+    With omega=None the relaxation factor is tuned from the observed convergence: Gauss-Seidel sweeps
+    (omega=1) run until the ratio of successive step norms settles (at most maxTuneSweeps sweeps), which
+    estimates rho_GS from below, and then Young's optimum omega = 2/(1 + sqrt(1 - rho_GS)) is used.  If the
+    step norm grows to divergence times its size when omega was set, the rest of the solve uses omega = 1.
+    Stopping rules and in-place update of x are the same as GaussSeidel.
+    :return: x, or (x, residual history, final omega) with history=True
+    """
+    A, b, diag, xa, bNorm = _IterativeSetup(Aaug, x)
+    n = len(b)
+
+    classes = _ColourClasses(A)
+    if len(classes) > n // 2:
+        classes = [np.array([i]) for i in range(n)]  # too many colours: serial sweep is cheaper
+
+    tuning = omega is None
+    w = 1.0 if tuning else omega
+    residuals = []
+    steps = []  # step norms since omega last changed
+    for iteration in range(Niter):
+        step = 0.0
+        stepNorm2 = 0.0
+        for C in classes:
+            dx = w * (b[C] - A[C] @ xa) / diag[C]
+            xa[C] += dx
+            step = max(step, np.abs(dx).max())
+            stepNorm2 += dx @ dx
+        steps.append(sqrt(stepNorm2))
+        if _IterationDone(A, b, xa, bNorm, step, rtol, xtol, residuals):
+            break
+
+        if not tuning or len(steps) < 3 or steps[-3] == 0.0:
+            continue
+        if w == 1.0:
+            # Gauss-Seidel phase: wait until the step ratio settles, it approaches rho_GS from below
+            rate, prevRate = steps[-1] / steps[-2], steps[-2] / steps[-3]
+            if rate < 1.0 and (abs(rate - prevRate) <= 0.01 * (1.0 - rate) or len(steps) >= maxTuneSweeps):
+                w = 2.0 / (1.0 + sqrt(1.0 - rate))  # Young's formula with rho_J^2 = rho_GS
+                steps = []
+        elif steps[-1] > divergence * steps[0]:
+            # over-relaxed SOR may grow for a while before it contracts, but not by this much: Young's
+            # formula does not apply to this A, so finish with plain Gauss-Seidel
+            w = 1.0
+            tuning = False
+
+    _StoreSolution(x, xa)
+    return (x, residuals, w) if history else x
+
+
+def _ColourClasses(A):
+    """
+    Greedy colouring of the coupling graph of A (rows i and j are coupled if A[i,j] or A[j,i] is non-zero).
+    :return: list of index arrays, one per colour, with no coupling inside a colour
+    """
+    n = A.shape[0]
+    coupled = (A != 0.0) | (A.T != 0.0)
+    np.fill_diagonal(coupled, False)
+    colour = np.full(n, -1)
+    for i in range(n):
+        taken = colour[coupled[i]]
+        taken = set(taken[taken >= 0].tolist())
+        c = 0
+        while c in taken:
+            c += 1
+        colour[i] = c
+    return [np.flatnonzero(colour == c) for c in range(colour.max() + 1)]
+
+
+def ConjugateGradient(A, b, x=None, precond="jacobi", Niter=None, rtol=1e-10, history=False):
+    """
+    Preconditioned conjugate gradient for Ax=b with A symmetric positive definite.
+    Only products A @ v are needed, so A may be a dense array, a scipy.sparse matrix or a callable v -> A v;
+    memory is that of A plus a few vectors, and a sparse A is never factored or made dense.
+    :param precond: "jacobi" (divide by diag(A)), "ic0" (incomplete Cholesky with the sparsity pattern of A,
+                    needs SciPy), None, or a callable r -> M^-1 r
+    :param Niter: largest number of iterations (default n)
+    :param rtol: stop once the relative residual ||b - Ax|| / ||b|| is below rtol
+    :return: x, or (x, residual history) with history=True; x is a list if b was a list
+    """
+    matvec = A if callable(A) else (A if hasattr(A, "tocsr") else np.asarray(A, dtype=float)).__matmul__
+    bb = np.asarray(b, dtype=float)
+    n = len(bb)
+    xa = np.zeros(n) if x is None else np.array(x, dtype=float)
+    if Niter is None:
+        Niter = n
+
+    if precond is None:
+        Minv = lambda r: r
+    elif callable(precond):
+        Minv = precond
+    elif callable(A):
+        raise ValueError("precond='{}' needs the matrix, not only a mat-vec.".format(precond))
+    elif precond == "jacobi":
+        d = A.diagonal() if hasattr(A, "tocsr") else np.asarray(A, dtype=float).diagonal()
+        if np.any(d <= 0.0):
+            raise ValueError("Matrix is not positive definite (non-positive diagonal).")
+        dInv = 1.0 / d
+        Minv = lambda r: dInv * r
+    elif precond == "ic0":
+        Minv = _IC0Preconditioner(A)
+    else:
+        raise ValueError("Unknown preconditioner '{}'.".format(precond))
+
+    bNorm = np.linalg.norm(bb)
+    bNorm = bNorm if bNorm > 0.0 else 1.0
+    r = bb - matvec(xa)
+    residuals = [np.linalg.norm(r) / bNorm]
+    if residuals[-1] > rtol:
+        z = Minv(r)
+        p = z.copy()
+        rz = r @ z
+        for iteration in range(Niter):
+            Ap = matvec(p)
+            pAp = p @ Ap
+            if pAp <= 0.0:
+                raise ValueError("Matrix is not positive definite (p.Ap <= 0).")
+            alpha = rz / pAp
+            xa += alpha * p
+            r -= alpha * Ap
+            residuals.append(np.linalg.norm(r) / bNorm)
+            if residuals[-1] <= rtol:
+                break
+            z = Minv(r)
+            rzNew = r @ z
+            p = z + (rzNew / rz) * p
+            rz = rzNew
+
+    xa = xa.tolist() if isinstance(b, list) else xa
+    return (xa, residuals) if history else xa
+
+
+def _IC0Preconditioner(A):
+    """
+    Zero fill-in incomplete Cholesky A ~ L L^T, computed column by column on the lower triangle of A in CSC
+    form so that L has exactly the sparsity pattern of A.
+    The factorization is a Python loop over the non-zeros (seconds for 10^5 unknowns), so hw3c uses it only
+    when asked to; the Jacobi preconditioner costs O(n).
+    :return: function r -> (L L^T)^-1 r by two triangular solves
+    """
+    if sp is None:
+        raise ValueError("precond='ic0' needs SciPy.")
+    L = sp.tril(sp.csc_matrix(A, dtype=float), format="csc")
+    L.sort_indices()
+    ptr, idx, val = L.indptr, L.indices, L.data
+    for k in range(L.shape[0]):
+        s, e = ptr[k], ptr[k + 1]
+        if s == e or idx[s] != k or val[s] <= 0.0:
+            raise ValueError("Incomplete Cholesky breakdown at pivot {}.".format(k))
+        val[s] = sqrt(val[s])
+        val[s + 1:e] /= val[s]
+        rows, col = idx[s + 1:e], val[s + 1:e]
+        for a in range(len(rows)):
+            # L[i][j] -= L[i][k] * L[j][k] for the rows i >= j of column k that are also in column j's pattern
+            j = rows[a]
+            js, je = ptr[j], ptr[j + 1]
+            pos = js + np.searchsorted(idx[js:je], rows[a:])
+            inPattern = pos < je
+            inPattern[inPattern] = idx[pos[inPattern]] == rows[a:][inPattern]
+            val[pos[inPattern]] -= col[a:][inPattern] * col[a]
+    # SuperLU on a triangular matrix in natural order without pivoting just stores L (no fill-in), and its
+    # compiled triangular solves are much faster per application than spsolve_triangular
+    T = splu(L, permc_spec="NATURAL", diag_pivot_thresh=0.0, options={"SymmetricMode": True})
+    return lambda r: T.solve(T.solve(r), trans="T")
+
+
 def main():
     '''
     This is a function I created for testing the numerical methods locally.
@@ -139,11 +918,28 @@ def main():
     #region testing Simpson
     p = Simpson(GPDF, (0, 1, -5, 0))  # should be close to 0.5
     print("Simpson p={:0.5f}".format(p))
+    pv = Simpson(GPDF, (0, 1, -5, [0, 1, 2]), vectorized=True)  # three integrals in one call
+    print("vectorized Simpson p=", pv)
+    pa, err, nEval = AdaptiveSimpson(GPDF, (0, 1, -5, 0), tol=1e-10)
+    print("adaptive Simpson p={:0.10f} (err ~{:0.1e}, {} evaluations)".format(pa, err, nEval))
+    pg = Integrate(GPDF, (0, 1, -5, 0), method="gauss")  # 20 PDF calls instead of 101
+    print("Gauss-Legendre p={:0.10f}".format(pg))
     #endregion
 
     #region testing Probability
     p1 = Probability(GPDF, (0, 1), 0, True)  # P(X > 0) for N(0,1) ~ 0.5
     print("p1={:0.5f}".format(p1))
+    pb = ProbabilityBatch(GPDF, (0, 1), [-1, 0, 1], GT=[False, True, True])  # ~[0.15866, 0.5, 0.15866]
+    print("batch p=", pb)
+    p5 = Probability(GPDF, (0, 1), 6, True, mode="exact")  # beyond the Simpson range, ~9.8659e-10
+    print("p5={:0.4e}".format(p5))
+    cq = GaussianQuantile([0.025, 0.5, 0.975], (0, 1))  # ~[-1.95996, 0, 1.95996]
+    print("quantiles c=", cq)
+    for cq in (0.0, -0.0, 0, 0.0):  # -0.0 and 0 share the 0.0 entry, so three of these are hits
+        CachedProbability(GPDF, (0, 1), cq, True)
+    print("cache:", CachedProbability.Stats())
+    table = GaussianCDFTable(0, 1)  # build once, then each query is an interpolation
+    print("table p=", table.Probability([-1, 0, 1]), "error bound {:0.1e}".format(table.ErrorBound))
     #endregion
 
     # simple Secant test on f(x) = x^2 - 2
@@ -153,12 +949,20 @@ def main():
     root, it = Secant(ftest, 1.0, 2.0)
     print("Secant root ~ sqrt(2):", root, "in", it, "iters")
 
+    # the same equation x^2 - a = 0 for several a in one batched solve
+    roots, its = SecantBatch(lambda x, a: x * x - a, 1.0, 2.0, args=(np.array([2.0, 3.0, 5.0]),))
+    print("SecantBatch roots ~ sqrt([2, 3, 5]):", roots, "in", its, "iters")
+
     # simple Gauss–Seidel test (2x2 system)
     Aaug = [[4.0, 1.0, 9.0],
             [2.0, 3.0, 13.0]]
     x0 = [0.0, 0.0]
-    x_gs = GaussSeidel(Aaug, x0, Niter=10)
-    print("Gauss–Seidel x:", x_gs)
+    x_gs, res = GaussSeidel(Aaug, x0, Niter=50, history=True)
+    print("Gauss–Seidel x:", x_gs, "after", len(res), "sweeps, residual {:0.1e}".format(res[-1]))
+    x_sor, res, w = SOR([[4.0, 1.0, 9.0], [2.0, 3.0, 13.0]], [0.0, 0.0], history=True)
+    print("SOR x:", x_sor, "after", len(res), "sweeps with omega = {:0.3f}".format(w))
+    x_cg, res = ConjugateGradient([[4.0, 1.0], [1.0, 3.0]], [1.0, 2.0], history=True)  # ~[0.0909, 0.6364]
+    print("CG x:", x_cg, "after", len(res) - 1, "iterations, residual {:0.1e}".format(res[-1]))
 
 #endregion
 
@@ -1,24 +1,25 @@
 #region imports
 from math import sqrt, pi, exp
-from NumericalMethods import GPDF, Simpson, Probability
+from NumericalMethods import GPDF, Simpson, Probability, CachedProbability
 #endregion
 
 #region function definitions
 def run_homework_cases():
     """
     Compute and print the two normal probabilities required in hw2a.
+    The values go through CachedProbability, so running the cases again (e.g. from hw3a) reuses them.
     """
     # First required value: P(x<105|N(100,12.5))
     mu1 = 100.0
     stDev1 = 12.5
     c1 = 105.0
-    p1 = Probability(GPDF, (mu1, stDev1), c1, GT=False)
+    p1 = CachedProbability(GPDF, (mu1, stDev1), c1, GT=False, mode="gauss")
 
     # Second required value: P(x>μ+2σ|N(100, 3)) where μ+2σ = 100 + 2*3 = 106
     mu2 = 100.0
     stDev2 = 3.0
     c2 = mu2 + 2.0 * stDev2
-    p2 = Probability(GPDF, (mu2, stDev2), c2, GT=True)
+    p2 = CachedProbability(GPDF, (mu2, stDev2), c2, GT=True, mode="gauss")
 
     # Print in the format shown in the assignment
     print("P(x<{:.2f}|N({:.0f},{:.1f}))={:.2f}".format(c1, mu1, stDev1, p1))
@@ -46,7 +47,7 @@ def main():
         mean_f = float(mean)
         stDev_f = float(stDev)
         c_f = float(c)
-        p_user = Probability(GPDF, (mean_f, stDev_f), c_f, GT)
+        p_user = Probability(GPDF, (mean_f, stDev_f), c_f, GT, mode="gauss")
         print("Result = {:.4f}".format(p_user))
     except ValueError:
         print("Could not convert your inputs to numbers.")
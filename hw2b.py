@@ -1,5 +1,5 @@
 # region imports
-from NumericalMethods import Secant
+from NumericalMethods import Secant, Brent
 from math import cos  # needed for cos(2x)
 
 
@@ -33,6 +33,12 @@ def main():
     print("root of fn2 = {root:0.4f}, after {iter:0d} iterations".format(root=r2[0], iter=r2[1]))
     print("root of fn2 = {root:0.4f}, after {iter:0d} iterations".format(root=r3[0], iter=r3[1]))
 
+    # Secant does not say whether it converged; the safeguarded solver reports it for the same settings
+    for fn, name, maxiter, xtol in ((fn1, "fn1", 5, 1e-4), (fn2, "fn2", 15, 1e-8), (fn2, "fn2", 3, 1e-8)):
+        r = Brent(fn, 1, 2, maxiter, xtol)
+        print("Brent: root of {} = {:0.4f}, after {:d} iterations, converged = {}, residual = {:0.2e}".format(
+            name, r.root, r.iterations, r.converged, r.residual))
+
 
 # endregion
 
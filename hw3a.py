@@ -1,25 +1,7 @@
 #region imports
 from math import sqrt, pi, exp
-from NumericalMethods import GPDF, Simpson, Probability
-#endregion
-
-
-#region root finding: secant method
-def secant(f, x0, x1, tol=1e-6, max_iter=100):
-    """
-    Secant method to find a root of f starting from x0, x1.
-    """
-    f0 = f(x0)
-    f1 = f(x1)
-    for _ in range(max_iter):
-        if abs(f1 - f0) < 1e-14:
-            break
-        x2 = x1 - f1 * (x1 - x0) / (f1 - f0)
-        if abs(x2 - x1) < tol:
-            return x2
-        x0, x1 = x1, x2
-        f0, f1 = f1, f(x1)
-    return x1
+from NumericalMethods import GPDF, Simpson, Probability, CachedProbability, GaussianQuantile, LRUCache
+from hw2a import run_homework_cases  # the hw2a cases, computed the same way as in hw2a
 #endregion
 
 
@@ -44,28 +26,11 @@ def outside_probability(mu, sigma, c):
     """
     p_center = central_probability(mu, sigma, c)
     return 1.0 - p_center
-#endregion
 
 
-#region homework 2a cases (unchanged)
-def run_homework_cases():
-    """
-    Compute and print the two normal probabilities required in hw2a.
-    """
-    # First required value: P(x<105|N(100,12.5))
-    mu1 = 100.0
-    stDev1 = 12.5
-    c1 = 105.0
-    p1 = Probability(GPDF, (mu1, stDev1), c1, GT=False)
-
-    # Second required value: P(x>μ+2σ|N(100, 3)) where μ+2σ = 100 + 2*3 = 106
-    mu2 = 100.0
-    stDev2 = 3.0
-    c2 = mu2 + 2.0 * stDev2
-    p2 = Probability(GPDF, (mu2, stDev2), c2, GT=True)
-
-    print("P(x<{:.2f}|N({:.0f},{:.1f}))={:.2f}".format(c1, mu1, stDev1, p1))
-    print("P(x>{:.2f}|N({:.0f},{:.0f}))={:.2f}".format(c2, mu2, stDev2, p2))
+# memoized versions used by main, which may be asked the same question again; see LRUCache.Stats() for hit rates
+cached_central_probability = LRUCache(central_probability, maxsize=256)
+cached_outside_probability = LRUCache(outside_probability, maxsize=256)
 #endregion
 
 
@@ -102,25 +67,25 @@ def main():
 
         if case == "1":
             GT = False
-            p = Probability(GPDF, (mean, stDev), c, GT)
+            p = CachedProbability(GPDF, (mean, stDev), c, GT)
             print("P(x<{:.4f}|N({:.4f},{:.4f})) = {:.6f}".format(c, mean, stDev, p))
         elif case == "2":
             GT = True
-            p = Probability(GPDF, (mean, stDev), c, GT)
+            p = CachedProbability(GPDF, (mean, stDev), c, GT)
             print("P(x>{:.4f}|N({:.4f},{:.4f})) = {:.6f}".format(c, mean, stDev, p))
         elif case == "3":
-            p = central_probability(mean, stDev, c)
+            p = cached_central_probability(mean, stDev, c)
             print("P({:.4f} < x < {:.4f}|N({:.4f},{:.4f})) = {:.6f}".format(
                 mean - (c - mean), mean + (c - mean), mean, stDev, p))
         elif case == "4":
-            p = outside_probability(mean, stDev, c)
+            p = cached_outside_probability(mean, stDev, c)
             print("P(x < {:.4f} OR x > {:.4f}|N({:.4f},{:.4f})) = {:.6f}".format(
                 mean - (c - mean), mean + (c - mean), mean, stDev, p))
         else:
             print("Unrecognized case selection.")
 
     elif mode == "p->c":
-        # user gives P, we solve for c using Secant method
+        # user gives P, we solve for c with the normal quantile function
         try:
             P_target = float(input("Desired probability (between 0 and 1)? "))
         except ValueError:
@@ -131,36 +96,14 @@ def main():
             print("Probability must be between 0 and 1 (exclusive).")
             return
 
-        # define F(c) for each case
-        if case == "1":
-            # left tail
-            def F(c):
-                return Probability(GPDF, (mean, stDev), c, GT=False) - P_target
-
-        elif case == "2":
-            # right tail
-            def F(c):
-                return Probability(GPDF, (mean, stDev), c, GT=True) - P_target
-
-        elif case == "3":
-            # central symmetric
-            def F(c):
-                return central_probability(mean, stDev, c) - P_target
-
-        elif case == "4":
-            # outside symmetric (two tails)
-            def F(c):
-                return outside_probability(mean, stDev, c) - P_target
-
-        else:
+        # each case is an inverse of the normal CDF, so solve for c directly instead of
+        # running the secant method over repeated numerical integrals
+        cases = {"1": "left", "2": "right", "3": "central", "4": "outside"}
+        if case not in cases:
             print("Unrecognized case selection.")
             return
 
-        # initial guesses around mean: one sigma and two sigma away
-        c0 = mean - stDev
-        c1 = mean + stDev
-
-        c_root = secant(F, c0, c1, tol=1e-6, max_iter=100)
+        c_root = GaussianQuantile(P_target, (mean, stDev), cases[case])
 
         # Report result
         if case in ["1", "2"]:
@@ -1,6 +1,10 @@
 # hw3b.py
 
-from math import sqrt, pi, gamma
+from math import sqrt, pi, lgamma, exp
+from functools import lru_cache
+import numpy as np
+from NumericalMethods import GaussianQuantile, GPDF, AdaptiveSimpson
+from Quadrature import AdaptiveGaussKronrod
 
 # t-distribution PDF (symmetric around 0)
 def t_pdf(u, m):
@@ -17,22 +21,187 @@ def simpson(f, a, b, n, *args):
         s += (4 if k % 2 == 1 else 2) * f(xk, *args)
     return s * h / 3.0
 
-# Normalization constant K_m
+# Normalization constant K_m, cached per m.  The gamma ratio is formed in log space with lgamma
+# because gamma itself overflows for m > ~340 even though K_m -> 1/sqrt(2 pi)
+@lru_cache(maxsize=None)
 def K_m(m):
-    return gamma((m + 1.0) / 2.0) / (sqrt(m * pi) * gamma(m / 2.0))
+    return exp(lgamma((m + 1.0) / 2.0) - lgamma(m / 2.0)) / sqrt(m * pi)
+
+# Simpson nodes and weights on [0, 1] with n panels, shared by every integral of t_cdf_array
+@lru_cache(maxsize=8)
+def simpson_template(n):
+    s = np.linspace(0.0, 1.0, n + 1)
+    w = np.ones(n + 1)
+    w[1:-1:2] = 4.0
+    w[2:-1:2] = 2.0
+    return s, w / (3.0 * n)
+
+# CDF for arrays of z and m (broadcast against each other), all integrals at once.
+# With u = sqrt(m) tan(theta) the integral of t_pdf over [0, |z|] becomes
+# sqrt(m) * integral of cos(theta)^(m-1) over [0, atan(|z|/sqrt(m))]: a bounded, smooth integrand on a
+# finite interval even for heavy tails and huge |z|, so one n_int-panel Simpson template (scaled to each
+# upper limit) is accurate to ~1e-10 for n_int = 256.  Rows are processed chunk at a time to bound memory.
+def t_cdf_array(z, m, n_int=256, chunk=4096):
+    z, m = np.broadcast_arrays(np.asarray(z, dtype=float), np.asarray(m, dtype=float))
+    shape = z.shape
+    z, m = z.ravel(), m.ravel()
+    m_unique, inverse = np.unique(m, return_inverse=True)
+    scale = np.array([K_m(float(v)) * sqrt(v) for v in m_unique])[inverse]
+    theta_max = np.arctan(np.abs(z) / np.sqrt(m))
+    s, w = simpson_template(n_int + n_int % 2)
+    integral = np.empty(z.size)
+    for i in range(0, z.size, chunk):
+        th = theta_max[i:i + chunk]
+        integral[i:i + chunk] = th * (np.cos(th[:, None] * s) ** (m[i:i + chunk, None] - 1.0) @ w)
+    return np.clip(0.5 + np.sign(z) * scale * integral, 0.0, 1.0).reshape(shape)
 
 # CDF F(z) for t-distribution with m d.o.f.
-def t_cdf(z, m, n_int=1000):
+# n_int=None integrates adaptively to tol, with Gauss-Kronrod 7/15 panels (method="kronrod", usually 15-45
+# evaluations) or adaptive Simpson (method="simpson"); an integer n_int uses the fixed n_int-panel Simpson rule.
+# If z or m is an array (or list) the whole batch goes through t_cdf_array instead
+def t_cdf(z, m, n_int=None, tol=1e-10, max_eval=4000, method="kronrod"):
+    if np.ndim(z) or np.ndim(m):
+        return t_cdf_array(z, m) if n_int is None else t_cdf_array(z, m, n_int)
     K = K_m(m)
     if z == 0.0:
         return 0.5
+    if n_int is None and method == "kronrod":
+        integral = AdaptiveGaussKronrod(lambda u: t_pdf(u, m), 0.0, abs(z), tol / K, max_eval)[0]
+    elif n_int is None:
+        # AdaptiveSimpson calls its integrand as fn((x, mu, sig)); mu and sig are unused here
+        integral = AdaptiveSimpson(lambda args: t_pdf(args[0], m), (0.0, 1.0, 0.0, abs(z)), tol / K, max_eval)[0]
+    else:
+        integral = simpson(t_pdf, 0.0, abs(z), n_int, m)
     if z > 0:
-        integral = simpson(t_pdf, 0.0, z, n_int, m)
         return 0.5 + K * integral
     else:  # z < 0, use symmetry
-        integral = simpson(t_pdf, 0.0, -z, n_int, m)
         return 0.5 - K * integral
 
+# Quantile (inverse CDF) of the t-distribution: z with t_cdf(z, m) = p, for arrays of p and m.
+# Newton steps are taken on theta = atan(z/sqrt(m)), where F is bounded and dF/dtheta = K_m sqrt(m)
+# cos(theta)^(m-1), starting from the normal quantile.  Each iteration is one batched t_cdf_array call; a step
+# leaving the current bracket [lo, hi] of theta is replaced by bisection, so heavy tails cannot diverge
+# The answer is as accurate as t_cdf_array (~1e-11 in p), which limits z for p within ~1e-6 of 0 or 1
+def t_ppf(p, m, tol=1e-12, max_iter=60):
+    p, m = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(m, dtype=float))
+    if np.any((p <= 0.0) | (p >= 1.0)):
+        raise ValueError("Probabilities must be between 0 and 1 (exclusive).")
+    shape = p.shape
+    p, m = p.ravel(), m.ravel()
+    root_m = np.sqrt(m)
+    m_unique, inverse = np.unique(m, return_inverse=True)
+    scale = np.array([K_m(float(v)) * sqrt(v) for v in m_unique])[inverse]
+
+    theta = np.arctan(np.atleast_1d(GaussianQuantile(p)) / root_m)
+    lo = np.full(p.size, -0.5 * pi)
+    hi = np.full(p.size, 0.5 * pi)
+    for _ in range(max_iter):
+        F = t_cdf_array(root_m * np.tan(theta), m)
+        below = F < p
+        lo = np.where(below, theta, lo)
+        hi = np.where(below, hi, theta)
+        with np.errstate(divide="ignore", invalid="ignore"):  # a flat dF (far tail) falls to bisection
+            new = theta - (F - p) / (scale * np.cos(theta) ** (m - 1.0))
+        new = np.where((new > lo) & (new < hi), new, 0.5 * (lo + hi))
+        converged = np.abs(new - theta) <= tol
+        theta = new
+        if converged.all():
+            break
+    z = (root_m * np.tan(theta)).reshape(shape)
+    return float(z) if z.ndim == 0 else z
+
+# Table of critical values t* for a grid of degrees of freedom and significance levels alpha:
+# P(T > t*) = alpha, or P(|T| > t*) = alpha if two_sided.  The whole grid is one t_ppf batch, plus an
+# m = infinity row (the normal quantile).  lookup works in the coordinates where t* is smooth: log(t*) against
+# the normal quantile z of alpha, by cubic Hermite interpolation with the exact slope
+# d log(t*)/dz = phi(z) / (f_m(t*) t*), and cubic in 1/m through the four nearest rows.  No root-find is
+# needed; grid points are exact.  On the default grid off-grid values agree with t_ppf to 6e-5 relative for
+# m >= 3 (integer or not), but only to 2e-3 for fractional m between 1 and 3, where t* changes fastest with m
+# (the default grid has rows every 1/8 there; linear interpolation between integer rows was off by 4%).
+# save / load use NumPy's .npz format
+class TCriticalTable:
+    DEFAULT_DFS = tuple(k / 8.0 for k in range(8, 24)) + tuple(range(3, 31)) + (40, 50, 60, 80, 100, 120, 200,
+                                                                                 500, 1000)
+    DEFAULT_ALPHAS = (0.25, 0.2, 0.15, 0.1, 0.05, 0.025, 0.02, 0.01, 0.005, 0.0025, 0.001, 0.0005)
+
+    def __init__(self, dfs, alphas, values, two_sided=False):
+        self.dfs = np.asarray(dfs, dtype=float)  # increasing
+        self.alphas = np.asarray(alphas, dtype=float)
+        self.values = np.asarray(values, dtype=float)  # values[i, j] for dfs[i] and alphas[j]
+        self.two_sided = bool(two_sided)
+
+        # interpolation grid with increasing axes: 1/m (0 for the m = infinity row) and z
+        order = np.argsort(-self.alphas)
+        z = np.atleast_1d(self._tail_quantile(self.alphas[order]))
+        t = np.vstack((z, self.values[::-1][:, order]))
+        m = np.concatenate(([np.inf], self.dfs[::-1]))[:, None]
+        f = np.array([K_m(float(v)) for v in m[1:, 0]])[:, None] * t_pdf(t[1:], m[1:])
+        slope = np.vstack((1.0 / z, GPDF((z, 0.0, 1.0)) / (f * t[1:])))
+        self._inv_m = 1.0 / m[:, 0]
+        self._z = z
+        self._log_t = np.log(t)
+        self._slope = slope
+
+    def _tail_quantile(self, alpha):
+        return GaussianQuantile(0.5 * alpha if self.two_sided else alpha, case="right")
+
+    @classmethod
+    def build(cls, dfs=DEFAULT_DFS, alphas=DEFAULT_ALPHAS, two_sided=False):
+        dfs = np.sort(np.asarray(dfs, dtype=float))
+        alphas = np.asarray(alphas, dtype=float)
+        tail = 0.5 * alphas if two_sided else alphas
+        if np.any((tail <= 0.0) | (tail >= 0.5)):
+            raise ValueError("Significance levels must give a tail probability between 0 and 0.5.")
+        values = t_ppf(1.0 - tail[None, :], dfs[:, None])
+        return cls(dfs, alphas, values, two_sided)
+
+    @staticmethod
+    def _npz_path(path):
+        # np.savez appends .npz to a path without it, so load must look for the same file
+        path = str(path)
+        return path if path.endswith(".npz") else path + ".npz"
+
+    def save(self, path):
+        np.savez(self._npz_path(path), dfs=self.dfs, alphas=self.alphas, values=self.values, two_sided=self.two_sided)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(cls._npz_path(path)) as data:
+            return cls(data["dfs"], data["alphas"], data["values"], bool(data["two_sided"]))
+
+    def lookup(self, m, alpha):
+        m, alpha = np.broadcast_arrays(np.asarray(m, dtype=float), np.asarray(alpha, dtype=float))
+        shape = m.shape
+        if np.any(m < self.dfs[0]):
+            raise ValueError("Degrees of freedom below the table ({:g}).".format(self.dfs[0]))
+        zg = self._z
+        z = np.atleast_1d(self._tail_quantile(alpha.ravel()))
+        if np.any((z < zg[0] - 1e-12) | (z > zg[-1] + 1e-12)):
+            raise ValueError("alpha outside the table range [{:g}, {:g}].".format(self.alphas.min(),
+                                                                                self.alphas.max()))
+        x = 1.0 / m.ravel()
+        xg = self._inv_m
+        p = min(4, xg.size)  # rows used by the interpolation in 1/m
+        i = np.clip(np.searchsorted(xg, x) - 1, 0, xg.size - 2)
+        rows = np.clip(i - (p - 1) // 2, 0, xg.size - p)[:, None] + np.arange(p)
+        j = np.clip(np.searchsorted(zg, z) - 1, 0, zg.size - 2)[:, None]
+        h = zg[j + 1] - zg[j]
+        u = (z[:, None] - zg[j]) / h
+        # cubic Hermite basis on [z_j, z_j+1], evaluated in each of the rows
+        h00, h01 = (1.0 + 2.0 * u) * (1.0 - u) ** 2, u * u * (3.0 - 2.0 * u)
+        h10, h11 = u * (1.0 - u) ** 2 * h, u * u * (u - 1.0) * h
+        y, d = self._log_t, self._slope
+        log_t = h00 * y[rows, j] + h01 * y[rows, j + 1] + h10 * d[rows, j] + h11 * d[rows, j + 1]
+        # Lagrange weights of the rows at x = 1/m
+        xr = xg[rows]
+        w = np.ones_like(xr)
+        for a in range(p):
+            for b in range(p):
+                if a != b:
+                    w[:, a] *= (x - xr[:, b]) / (xr[:, a] - xr[:, b])
+        t = np.exp((w * log_t).sum(axis=1)).reshape(shape)
+        return float(t) if t.ndim == 0 else t
+
 def main():
     print("t-distribution CDF calculator (hw3b)")
     try:
@@ -48,6 +217,7 @@ def main():
 
     prob = t_cdf(z, m)
     print(f"F({z:.4f}) for m = {m} ≈ {prob:.6f}")
+    print(f"two-sided 95% critical value for m = {m}: t* ≈ {t_ppf(0.975, m):.6f}")
 
 if __name__ == "__main__":
     main()
@@ -3,8 +3,12 @@
 # region imports
 from copy import deepcopy
 from math import sqrt
-from Gauss_Elim import AugmentMatrix
-from DoolittleMethod import LUSolve
+from time import perf_counter
+import numpy as np
+from Gauss_Elim import AugmentMatrix, EchelonForm
+from DoolittleMethod import LUSolve, LUFactorization
+from NumericalMethods import GaussSeidel, ConjugateGradient
+from BandedMatrix import BandedMatrix, Bandwidth, BandedSolve
 # endregion
 
 
@@ -17,77 +21,160 @@ def is_symmetric(A, tol=1e-12):
     return True
 
 
+def _float_array(A):
+    """
+    A as a float array without copying if it already is one (so a float32 factor stays float32).
+    """
+    if isinstance(A, np.ndarray) and A.dtype.kind == "f":
+        return A
+    return np.asarray(A, dtype=float)
+
+
+def cholesky_attempt(A, dtype=float):
+    """
+    Attempt the Cholesky factorization A = L L^T once.
+    Column j of L needs one vectorized inner product per row (L[j+1:, :j] @ L[j, :j]) instead of a Python sum.
+    Returns (L, None) on success, or (None, j) where j is the pivot at which A[j][j] - sum(L[j][k]^2) <= 0,
+    i.e. A is not positive definite.  dtype=np.float32 factors in single precision (half the memory).
+    """
+    A = np.asarray(A, dtype=dtype)
+    n = len(A)
+    L = np.zeros((n, n), dtype=dtype)
+    for j in range(n):
+        d = A[j, j] - L[j, :j] @ L[j, :j]
+        if d <= 0.0:
+            return None, j
+        L[j, j] = sqrt(d)
+        L[j+1:, j] = (A[j+1:, j] - L[j+1:, :j] @ L[j, :j]) / L[j, j]
+    return L, None
+
+
 def is_positive_definite(A):
     """
     Check PD by attempting Cholesky factorization without actually returning L.
     """
-    n = len(A)
-    L = [[0.0]*n for _ in range(n)]
-    for i in range(n):
-        for j in range(i+1):
-            s = sum(L[i][k]*L[j][k] for k in range(j))
-            if i == j:
-                val = A[i][i] - s
-                if val <= 0.0:
-                    return False
-                L[i][i] = sqrt(val)
-            else:
-                if abs(L[j][j]) < 1e-15:
-                    return False
-                L[i][j] = (A[i][j] - s) / L[j][j]
-    return True
+    return cholesky_attempt(A)[1] is None
 
 
 def cholesky_factor(A):
-    n = len(A)
-    L = [[0.0]*n for _ in range(n)]
-    for i in range(n):
-        for j in range(i+1):
-            s = sum(L[i][k]*L[j][k] for k in range(j))
-            if i == j:
-                val = A[i][i] - s
-                if val <= 0.0:
-                    raise ValueError("Matrix is not positive definite.")
-                L[i][i] = sqrt(val)
-            else:
-                L[i][j] = (A[i][j] - s) / L[j][j]
+    L, fail = cholesky_attempt(A)
+    if fail is not None:
+        raise ValueError("Matrix is not positive definite (pivot {}).".format(fail))
     return L
 
 
 def forward_substitution(L, b):
+    L = _float_array(L)
     n = len(L)
-    y = [0.0]*n
+    y = np.array(b, dtype=float)
     for i in range(n):
-        s = sum(L[i][j]*y[j] for j in range(i))
-        y[i] = (b[i] - s)/L[i][i]
+        y[i] = (y[i] - L[i, :i] @ y[:i])/L[i, i]
     return y
 
 
 def backward_substitution(U, y):
+    U = _float_array(U)
     n = len(U)
-    x = [0.0]*n
+    x = np.array(y, dtype=float)
     for i in reversed(range(n)):
-        s = sum(U[i][j]*x[j] for j in range(i+1, n))
-        x[i] = (y[i] - s)/U[i][i]
+        x[i] = (x[i] - U[i, i+1:] @ x[i+1:])/U[i, i]
     return x
 
 
-def cholesky_solve(A, b):
-    L = cholesky_factor(A)
-    y = forward_substitution(L, b)
+def backward_substitution_transpose(L, y):
+    """
+    Solve L^T x = y using column i of L as row i of L^T, so the transpose is never built.
+    """
+    L = _float_array(L)
     n = len(L)
-    U = [[L[j][i] for j in range(n)] for i in range(n)]  # U = L^T
-    x = backward_substitution(U, y)
+    x = np.array(y, dtype=float)
+    for i in reversed(range(n)):
+        x[i] = (x[i] - L[i+1:, i] @ x[i+1:])/L[i, i]
     return x
 
 
-def solve_system(A, b):
+def cholesky_solve(A, b, L=None):
+    """
+    Solve Ax = b with L y = b and L^T x = y.  Pass L from cholesky_attempt to skip factoring A again.
+    """
+    if L is None:
+        L = cholesky_factor(A)
+    y = forward_substitution(L, b)
+    x = backward_substitution_transpose(L, y)
+    return x.tolist() if isinstance(b, list) else x
+
+
+def cg_solve(A, b, rtol=1e-10, Niter=None, precond="jacobi"):
+    """
+    Preconditioned conjugate gradient (NumericalMethods.ConjugateGradient).  Only mat-vecs with A are used.
+    The Jacobi preconditioner costs O(n) to set up; precond="ic0" (incomplete Cholesky) needs fewer
+    iterations but its factorization is a Python loop over the non-zeros, so it is opt-in.  If the incomplete
+    factorization breaks down, Jacobi is used instead.
+    Raises ValueError if A turns out not to be positive definite or rtol is not reached.
+    :return: (x, method_str)
+    """
+    x = None
+    if precond == "ic0":
+        try:
+            x, res = ConjugateGradient(A, b, precond="ic0", Niter=Niter, rtol=rtol, history=True)
+            method = "Conjugate gradient (IC(0))"
+        except ValueError:
+            pass
+    if x is None:
+        x, res = ConjugateGradient(A, b, precond="jacobi", Niter=Niter, rtol=rtol, history=True)
+        method = "Conjugate gradient (Jacobi)"
+    if res[-1] > rtol:
+        raise ValueError("Conjugate gradient did not converge (relative residual {:.1e}).".format(res[-1]))
+    return x, method
+
+
+def solve_system(A, b, band_fraction=0.25, precision="double", sparse_fraction=0.05, cg_min_size=1000,
+                 cg_precond="jacobi"):
     """
-    Decide whether to use Cholesky or Doolittle, solve, and return (x, method_str).
+    Decide whether to use a banded solver, conjugate gradient, Cholesky or Doolittle, solve, and return
+    (x, method_str).
+    A may also be given directly as a BandedMatrix.  A dense A whose band (lower + upper + 1 diagonals) covers
+    at most band_fraction of its columns is packed into banded storage and solved in O(n*l*u) with the Thomas
+    algorithm or banded LU when A is strictly diagonally dominant, banded Cholesky when it is SPD and banded LU
+    with partial pivoting otherwise (see BandedMatrix.BandedSolve).
+    A symmetric scipy.sparse matrix, or a symmetric dense A with at least cg_min_size rows and at most
+    sparse_fraction non-zero entries, is solved by preconditioned conjugate gradient (see cg_solve), which never
+    forms a dense factor; cg_precond selects its preconditioner.  A sparse A that is not symmetric, or for which
+    conjugate gradient fails (not positive definite), is made dense.
+    precision="mixed" factors a dense A in float32 and refines to float64 accuracy (see mixed_precision_solve).
     """
-    if is_symmetric(A) and is_positive_definite(A):
+    if isinstance(A, BandedMatrix):
+        x, method = BandedSolve(A, b)
+        return (x.tolist() if isinstance(b, list) else x), method
+    if hasattr(A, "tocsr"):  # scipy.sparse matrix
+        if abs(A - A.T).max() <= 1e-12:
+            try:
+                return cg_solve(A, b, precond=cg_precond)
+            except ValueError:
+                pass  # indefinite or not converging: solve it densely below
+        A = A.toarray()
+    n = len(A)
+    lower, upper = Bandwidth(A)
+    if lower + upper + 1 <= band_fraction * n:
+        try:
+            x, method = BandedSolve(BandedMatrix.FromDense(A, lower, upper), b)
+            return (x.tolist() if isinstance(b, list) else x), method
+        except ValueError:
+            pass  # singular: let the dense solver below report it
+    if n >= cg_min_size and np.count_nonzero(A) <= sparse_fraction * n * n and is_symmetric(A):
+        try:
+            return cg_solve(A, b, precond=cg_precond)
+        except ValueError:
+            pass  # not positive definite or too slow to converge: factor it instead
+    if precision == "mixed":
+        x, method, berr = mixed_precision_solve(A, b)
+        return x, method
+
+    # one factorization attempt serves as both the SPD test and the factor used for the solve
+    L, fail = cholesky_attempt(A) if is_symmetric(A) else (None, 0)
+    if fail is None:
         # Use Cholesky
-        x = cholesky_solve(A, b)
+        x = cholesky_solve(A, b, L)
         method = "Cholesky"
     else:
         x = LUSolve(A, b)
@@ -95,6 +182,204 @@ def solve_system(A, b):
     return x, method
 
 
+def backward_error(A, x, b):
+    """
+    Normwise backward error ||b - Ax|| / (||A|| ||x|| + ||b||) in the infinity norm: the smallest relative
+    change to A and b for which x is the exact solution.
+    """
+    A = _float_array(A)
+    x = np.asarray(x, dtype=float)
+    b = np.asarray(b, dtype=float)
+    r = b - A @ x
+    scale = np.abs(A).sum(axis=1).max() * np.abs(x).max() + np.abs(b).max()
+    return float(np.abs(r).max() / scale) if scale > 0.0 else 0.0
+
+
+def mixed_precision_solve(A, b, tol=None, max_refine=10):
+    """
+    Solve Ax = b with the factorization done in float32 and iterative refinement in float64:
+    x += solve(b - A x), where the residual is formed in float64 against the original A and the correction
+    reuses the float32 factor.  The O(n^3) factor therefore takes half the memory and bandwidth, and each
+    refinement step costs O(n^2).  A symmetric A uses the same Cholesky attempt as solve_system, anything
+    else (or a failed attempt) Doolittle LU.  Refinement stops when the backward error is below tol
+    (default n * machine epsilon for float64).  If it stalls (the error does not at least halve in a step),
+    or the float32 factor cannot be built, the system is solved again in full precision by solve_system.
+    :return: (x, method_str, backward error of x)
+    """
+    A64 = np.asarray(A, dtype=float)
+    b64 = np.asarray(b, dtype=float)
+    n = len(A64)
+    if tol is None:
+        tol = n * np.finfo(float).eps
+
+    L32, fail = cholesky_attempt(A64, np.float32) if is_symmetric(A64) else (None, 0)
+    try:
+        if fail is None:
+            solve = lambda r: cholesky_solve(None, r, L32)
+            method = "Cholesky"
+        else:
+            solve = LUFactorization(A64, dtype=np.float32).Solve
+            method = "Doolittle"
+    except ValueError:
+        solve = None  # singular in single precision
+
+    if solve is not None:
+        x = np.asarray(solve(b64), dtype=float)
+        berr = backward_error(A64, x, b64)
+        for _ in range(max_refine):
+            if berr <= tol:
+                return (x.tolist() if isinstance(b, list) else x), "Mixed-precision " + method, berr
+            x += solve(b64 - A64 @ x)
+            prev, berr = berr, backward_error(A64, x, b64)
+            if not berr <= 0.5 * prev:
+                break  # stalled (or NaN): float32 is not accurate enough for this A
+        if berr <= tol:
+            return (x.tolist() if isinstance(b, list) else x), "Mixed-precision " + method, berr
+
+    x, method = solve_system(A64, b64)
+    berr = backward_error(A64, x, b64)
+    return (x.tolist() if isinstance(b, list) else x), method + " (float64 fallback)", berr
+
+
+class SolveReport:
+    """
+    Outcome of dispatch_solve: the solution x, the method used, the structure findings from
+    analyze_structure and the elapsed seconds per phase ("analyze", "factor", "solve").
+    """
+    __slots__ = ("x", "method", "findings", "timings")
+
+    def __init__(self, x, method, findings, timings):
+        self.x = x
+        self.method = method
+        self.findings = findings
+        self.timings = timings
+
+    def __repr__(self):
+        return "SolveReport(method={!r}, findings={!r}, timings={!r})".format(self.method, self.findings,
+                                                                             self.timings)
+
+
+def analyze_structure(A, band_fraction=0.25, sparse_fraction=0.1, tol=1e-12):
+    """
+    Inspect A once (vectorized over the whole array) and return a dict of structure findings:
+    n, diagonal, lower_triangular, upper_triangular, bandwidth (lower, upper), banded (the band covers at most
+    band_fraction of the columns), symmetric, dominance_ratio (max over rows of sum_{j != i} |A[i][j]| / |A[i][i]|),
+    diagonally_dominant (strictly, in the given row order: dominance_ratio < 1), density (fraction of non-zero
+    entries) and sparse (density <= sparse_fraction).
+    spd is None here: positive definiteness is only known after a Cholesky attempt, which dispatch_solve
+    makes (and keeps as the factor) when A is symmetric.
+    """
+    A = np.asarray(A, dtype=float)
+    n = len(A)
+    nz = A != 0.0
+    lower, upper = Bandwidth(A)
+    absA = np.abs(A)
+    offDiagSum = absA.sum(axis=1) - absA.diagonal()
+    density = float(nz.sum()) / (n * n) if n else 0.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = offDiagSum / absA.diagonal()
+    dominance = float(np.nan_to_num(ratio, nan=np.inf).max(initial=0.0))
+    return {
+        "n": n,
+        "diagonal": lower == upper == 0,
+        "lower_triangular": upper == 0,
+        "upper_triangular": lower == 0,
+        "bandwidth": (lower, upper),
+        "banded": lower + upper + 1 <= band_fraction * n,
+        "symmetric": bool(np.all(np.abs(A - A.T) <= tol)),
+        "dominance_ratio": dominance,
+        "diagonally_dominant": dominance < 1.0,
+        "density": density,
+        "sparse": density <= sparse_fraction,
+        "spd": None,
+    }
+
+
+def dispatch_solve(A, b, band_fraction=0.25, sparse_fraction=0.1, rtol=1e-12, gs_max_sweeps=50):
+    """
+    Structure-aware version of solve_system: analyze A once and route to the cheapest solver that is correct
+    for what was found.
+      diagonal                      -> x = b / diag(A), O(n)
+      lower / upper triangular      -> one forward or back substitution, O(n^2)
+      banded                        -> BandedSolve (Thomas, banded Cholesky or banded LU), O(n*l*(l+u))
+      symmetric                     -> one Cholesky attempt; if it succeeds A is SPD and the factor is used
+      strictly diagonally dominant,
+        sparse, few sweeps needed   -> GaussSeidel, O(n^2) per sweep
+      anything else                 -> Gauss_Elim elimination of [A|b] and back substitution for one
+                                       right-hand side, Doolittle LU (factor once) for several
+    Gauss-Seidel contracts the error by at least the dominance ratio q per sweep, so it needs about
+    log(rtol) / log(q) sweeps.  It is only tried when that is at most gs_max_sweeps and n/3 (one sweep costs
+    ~n^2 against ~n^3/3 to eliminate), and it is stopped at twice the prediction.
+    A solver that cannot finish (Cholesky on an indefinite A, Gauss-Seidel not reaching rtol) hands over to
+    the next general one; its time is reported as its own phase ("cholesky_failed", "gauss_seidel_failed").
+    :param b: right-hand side vector, or n x k matrix of right-hand sides
+    :return: a SolveReport; x is a list if b was a list
+    """
+    timings = {"analyze": 0.0, "factor": 0.0, "solve": 0.0}
+    t0 = perf_counter()
+    findings = analyze_structure(A, band_fraction, sparse_fraction)
+    M = np.asarray(A, dtype=float)
+    bb = np.asarray(b, dtype=float)
+    timings["analyze"] = perf_counter() - t0
+
+    def report(x, method):
+        return SolveReport(x.tolist() if isinstance(b, list) else x, method, findings, timings)
+
+    def timed(phase, fn, *args):
+        t = perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            timings[phase] += perf_counter() - t
+
+    if findings["diagonal"]:
+        d = M.diagonal()
+        if np.all(d != 0.0):
+            return report(timed("solve", lambda: (bb.T / d).T), "Diagonal")
+    elif findings["lower_triangular"] and np.all(M.diagonal() != 0.0):
+        return report(timed("solve", forward_substitution, M, bb), "Forward substitution")
+    elif findings["upper_triangular"] and np.all(M.diagonal() != 0.0):
+        return report(timed("solve", backward_substitution, M, bb), "Back substitution")
+
+    if findings["banded"]:
+        lower, upper = findings["bandwidth"]
+        try:
+            x, method = timed("solve", lambda: BandedSolve(BandedMatrix.FromDense(M, lower, upper), bb))
+            return report(x, method)
+        except ValueError:
+            pass  # singular: the general solver below reports it
+
+    if findings["symmetric"]:
+        t = perf_counter()
+        L, fail = cholesky_attempt(M)
+        findings["spd"] = fail is None
+        if L is not None:
+            timings["factor"] += perf_counter() - t
+            return report(timed("solve", cholesky_solve, M, bb, L), "Cholesky")
+        timings["cholesky_failed"] = perf_counter() - t
+    else:
+        findings["spd"] = False
+
+    q = findings["dominance_ratio"]
+    if findings["diagonally_dominant"] and findings["sparse"] and bb.ndim == 1:
+        sweeps = int(np.ceil(np.log(rtol) / np.log(q))) if q > 0.0 else 1
+        if sweeps <= min(gs_max_sweeps, len(bb) // 3):
+            t = perf_counter()
+            x, residuals = GaussSeidel(AugmentMatrix(M, bb), np.zeros(len(bb)), 2 * sweeps, rtol, 0.0, True)
+            if residuals[-1] <= rtol:
+                timings["solve"] += perf_counter() - t
+                return report(x, "Gauss-Seidel")
+            timings["gauss_seidel_failed"] = perf_counter() - t
+
+    if bb.ndim == 1:
+        E = timed("factor", EchelonForm, AugmentMatrix(M, bb))
+        if np.all(E.diagonal() != 0.0):
+            return report(timed("solve", backward_substitution, E[:, :-1], E[:, -1]), "Gauss elimination")
+        raise ValueError("Matrix is singular.")
+    LU = timed("factor", LUFactorization, M)
+    return report(timed("solve", LU.Solve, bb), "Doolittle")
+
+
 def main():
     # Problem 1:
     #  x1 + x2 - 3x3 + 2x4 = 15
@@ -134,6 +419,18 @@ def main():
         x2[0], x2[1], x2[2], x2[3]
     ))
 
+    # the structure-aware dispatcher reports why it chose its method and where the time went
+    for name, A, b in (("Problem 1", A1, b1), ("Problem 2", A2, b2)):
+        report = dispatch_solve(A, b)
+        found = [k for k in ("diagonal", "lower_triangular", "upper_triangular", "banded", "symmetric", "spd",
+                             "diagonally_dominant", "sparse") if report.findings[k]]
+        print("{}: {} (structure: {}; {})".format(name, report.method, ", ".join(found) or "general dense",
+              ", ".join("{} {:.1e} s".format(k, v) for k, v in report.timings.items())))
+
+    # float32 factor + float64 refinement recovers full accuracy
+    x1m, method1m, berr1 = mixed_precision_solve(A1, b1)
+    print("Problem 1 with {}: backward error {:.1e}".format(method1m, berr1))
+
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,7 @@
 #region imports
 from math import sqrt, pi, exp, cos
 from scipy.integrate import quad # NEW
+from Quadrature import GaussLegendre, AdaptiveGaussKronrod
 #endregion
 
 #region function definitions
@@ -56,7 +57,7 @@ def GPDF(args):
     return fx
 
 # Changed Simpson and replaced with quad from scipy.integration
-def Simpson(fn, args, N=100):
+def Simpson(fn, args, N=100, method="quad"):
     """
     This executes the Simpson 1/3 rule for numerical integration (see page 832, Table 19.4).
     As I recall:
@@ -66,6 +67,8 @@ def Simpson(fn, args, N=100):
     4. return the area beneath the function fx
     :param fx: some function of x to integrate
     :param args: a tuple containing (mean, stDev, lhl, rhl)
+    :param method: "quad" (scipy), "gauss" (20-node Gauss-Legendre) or "kronrod" (adaptive Gauss-Kronrod 7/15,
+                   15 evaluations for a smooth fn); see Quadrature.py
     :return: the area beneath the function between lhl and rhl
     """
     mu, sig, lhl, rhl = args  # unpack arguments
@@ -73,6 +76,12 @@ def Simpson(fn, args, N=100):
     def f_x(x):
         return fn((x, mu, sig))
 
+    if method == "gauss":
+        return GaussLegendre(fn, args)
+    if method == "kronrod":
+        return AdaptiveGaussKronrod(f_x, lhl, rhl, vectorized=False)[0]
+    if method != "quad":
+        raise ValueError("method must be 'quad', 'gauss' or 'kronrod', not {!r}.".format(method))
     val, err = quad(f_x, lhl, rhl)
     return val
 #endregion
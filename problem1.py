@@ -71,7 +71,9 @@ def F_tlnpdf(args):
     if D>D_Max or D<D_Min:
         return 0
 
-    P = Simpson(lambda args: tln_PDF((D, mu, sig, F_DMin, F_DMax)), (mu, sig, D_Min, D))
+    # integrate f_trunc at each node x = args[0] (not the constant f_trunc(D)); adaptive Gauss-Kronrod needs 15
+    # PDF evaluations per call on this smooth integrand, and fsolve calls this for every sampled rock
+    P = Simpson(lambda args: tln_PDF((args[0], mu, sig, F_DMin, F_DMax)), (mu, sig, D_Min, D), method="kronrod")
     return P
 
 def makeSample(args, N=100):